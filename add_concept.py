@@ -1,4 +1,5 @@
 import chromadb
+from chromadb.utils import embedding_functions
 
 client = chromadb.PersistentClient(path="./chroma_db")
 collection = client.get_collection("orbital_dynamics")
@@ -218,21 +219,31 @@ DOMAIN: orbital_dynamics"""
 
 print(f"Adding {len(CORE_CONCEPTS)} core orbital mechanics concepts...")
 
+# Embed every concept in one batched forward pass with the same MiniLM model
+# Chroma uses for query_texts, then hand Chroma the vectors directly
+texts = [c["text"] for c in CORE_CONCEPTS]
+embed = embedding_functions.DefaultEmbeddingFunction()
+embeddings = embed(texts)
+
 collection.add(
-    documents=[c["text"] for c in CORE_CONCEPTS],
+    documents=texts,
+    embeddings=embeddings,
     metadatas=[{"source": "curated", "type": "concept"} for c in CORE_CONCEPTS],
     ids=[c["id"] for c in CORE_CONCEPTS]
 )
 
 print(f"Total documents now: {collection.count()}")
+
+# Check the new concepts through the same exact in-memory index the API uses
+from query_rag import refresh_index, search
+refresh_index()
+
 print("\nTesting Mars query...")
-r = collection.query(query_texts=["Mars orbital period eccentricity"], n_results=2)
-for i, doc in enumerate(r["documents"][0]):
+for i, doc in enumerate(search("Mars orbital period eccentricity", n_results=2)):
     print(f"\nResult {i+1}:")
     print(doc[:300])
 
 print("\nTesting Hohmann transfer...")
-r = collection.query(query_texts=["Hohmann transfer orbit delta-v"], n_results=2)
-for i, doc in enumerate(r["documents"][0]):
+for i, doc in enumerate(search("Hohmann transfer orbit delta-v", n_results=2)):
     print(f"\nResult {i+1}:")
     print(doc[:300])
\ No newline at end of file
@@ -3,21 +3,28 @@ AI Scenario Generator with Automatic Velocity Validation
 Prevents falling/escaping bodies in ALL scenarios
 """
 
-import requests
+import httpx
+import asyncio
 import json
 import math
+import copy
+import re
+import numpy as np
 import sys
 import os
+import threading
 
 # Import validator
 sys.path.insert(0, os.path.dirname(__file__))
 try:
-    from scenario_validator import fix_scenario_velocities
+    from scenario_validator import fix_scenario_velocities, validate_scenario
     VALIDATOR_AVAILABLE = True
 except:
     VALIDATOR_AVAILABLE = False
     print("⚠️  Warning: scenario_validator not available - velocities won't be auto-fixed")
 
+from text_match import KeywordMatcher
+
 try:
     from orbital_physics import circular_orbit_velocity, earth_moon_system
 except:
@@ -25,8 +32,119 @@ except:
         G = 4 * math.pi**2
         return math.sqrt(G * mass_central / radius)
 
+try:
+    from chromadb.utils import embedding_functions
+    _cache_embedder = embedding_functions.DefaultEmbeddingFunction()
+    SEMANTIC_CACHE_AVAILABLE = True
+except:
+    SEMANTIC_CACHE_AVAILABLE = False
+
 OLLAMA_URL = "http://localhost:11434/api/generate"
 MODEL = "llama3.1"
+# Keep the model (and its KV cache for the unchanged system prompt) loaded
+# between requests so Ollama can reuse the prompt prefix instead of re-prefilling
+OLLAMA_KEEP_ALIVE = "30m"
+
+# Shared keep-alive connection pool — no TCP setup per scenario request,
+# and the event loop stays free while the LLM generates
+_ollama = httpx.AsyncClient(
+    timeout=120.0,
+    limits=httpx.Limits(max_keepalive_connections=4),
+)
+
+# Compiled once — markdown fence stripping and first-object JSON decoding
+_MARKDOWN_FENCE = re.compile(r"```(?:json)?")
+_JSON_DECODER   = json.JSONDecoder()
+
+# ── SEMANTIC SCENARIO CACHE ──────────────────────────────────
+# Paraphrases of an earlier prompt ("TRAPPIST-1 system" vs "simulate TRAPPIST-1")
+# reuse the earlier AI scenario instead of another multi-second Ollama call.
+# A hit also needs the same numbers ("3 planets" vs "5 planets" embed almost
+# identically). At most SEMANTIC_CACHE_MAX entries, least recently used evicted.
+SEMANTIC_CACHE_PATH = "./scenario_cache.json"
+SEMANTIC_CACHE_THRESHOLD = 0.92   # cosine similarity needed for a hit
+SEMANTIC_CACHE_MAX = 256
+
+_NUMBER = re.compile(r"\d+(?:\.\d+)?")
+
+_scenario_cache = {"vectors": None, "prompts": [], "scenarios": []}
+
+# Saving runs in a worker thread: each store leaves its (prompts, vectors,
+# scenarios) snapshot in _pending_save and the next writer takes the latest
+# one, so out-of-order writes never put an older cache on disk.
+_pending_save = None
+_pending_lock = threading.Lock()   # held only to swap _pending_save
+_save_lock    = threading.Lock()   # one writer at a time
+
+def _embed_prompt(text: str):
+    """Unit-length MiniLM embedding of a prompt."""
+    v = np.asarray(_cache_embedder([text])[0], dtype=np.float32)
+    return v / (np.linalg.norm(v) + 1e-12)
+
+def _load_scenario_cache():
+    """Load cached (prompt embedding → scenario) pairs saved by earlier runs."""
+    if not SEMANTIC_CACHE_AVAILABLE or not os.path.exists(SEMANTIC_CACHE_PATH):
+        return
+    try:
+        with open(SEMANTIC_CACHE_PATH, "r", encoding="utf-8") as f:
+            saved = json.load(f)
+        if saved["scenarios"]:
+            _scenario_cache["vectors"]   = np.asarray(saved["vectors"], dtype=np.float32)[-SEMANTIC_CACHE_MAX:]
+            _scenario_cache["prompts"]   = saved["prompts"][-SEMANTIC_CACHE_MAX:]
+            _scenario_cache["scenarios"] = saved["scenarios"][-SEMANTIC_CACHE_MAX:]
+    except Exception as e:
+        print(f"⚠️  Warning: could not load scenario cache: {e}")
+
+def _cache_lookup(prompt: str, q):
+    """
+    Return the cached scenario most similar to q if it clears the threshold
+    and its prompt has the same numbers; a hit becomes most recently used.
+    """
+    vectors = _scenario_cache["vectors"]
+    if vectors is None:
+        return None
+    scores = vectors @ q
+    best = int(np.argmax(scores))
+    if (scores[best] < SEMANTIC_CACHE_THRESHOLD
+            or _NUMBER.findall(_scenario_cache["prompts"][best]) != _NUMBER.findall(prompt)):
+        return None
+    order = [i for i in range(len(vectors)) if i != best] + [best]
+    _scenario_cache["vectors"]   = vectors[order]
+    _scenario_cache["prompts"]   = [_scenario_cache["prompts"][i] for i in order]
+    _scenario_cache["scenarios"] = [_scenario_cache["scenarios"][i] for i in order]
+    return copy.deepcopy(_scenario_cache["scenarios"][-1])
+
+def _cache_store(prompt: str, q, scenario: dict):
+    """Add a freshly generated scenario to the cache (evicting the least
+    recently used past SEMANTIC_CACHE_MAX); _save_scenario_cache persists it."""
+    global _pending_save
+    vectors = _scenario_cache["vectors"]
+    _scenario_cache["vectors"]   = (q[None, :] if vectors is None else np.vstack([vectors, q]))[-SEMANTIC_CACHE_MAX:]
+    _scenario_cache["prompts"]   = (_scenario_cache["prompts"] + [prompt])[-SEMANTIC_CACHE_MAX:]
+    _scenario_cache["scenarios"] = (_scenario_cache["scenarios"] + [copy.deepcopy(scenario)])[-SEMANTIC_CACHE_MAX:]
+    with _pending_lock:
+        _pending_save = (_scenario_cache["prompts"], _scenario_cache["vectors"], _scenario_cache["scenarios"])
+
+def _save_scenario_cache():
+    """Write the latest stored cache snapshot atomically (temp file + os.replace)."""
+    global _pending_save
+    with _save_lock:
+        with _pending_lock:
+            snapshot, _pending_save = _pending_save, None
+        if snapshot is None:
+            return
+        prompts, vectors, scenarios = snapshot
+        tmp_path = SEMANTIC_CACHE_PATH + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"prompts":   prompts,
+                           "vectors":   vectors.tolist(),
+                           "scenarios": scenarios}, f)
+            os.replace(tmp_path, SEMANTIC_CACHE_PATH)
+        except Exception as e:
+            print(f"⚠️  Warning: could not save scenario cache: {e}")
+
+_load_scenario_cache()
 
 # [Previous SCENARIO_SYSTEM_PROMPT - same as before]
 SCENARIO_SYSTEM_PROMPT = """You are a physics simulation expert. Convert any user request into a REBOUND N-body simulation.
@@ -80,44 +198,103 @@ COLOR GUIDE:
 - Black hole: "#220022"    Moon: "#cccccc"        Comet: "#aaddff"
 """
 
-def generate_scenario_from_text(user_input: str) -> dict:
-    """Generate scenario from Ollama and auto-fix velocities."""
+async def read_streamed_json_object(response) -> str:
+    """
+    Accumulate a streaming Ollama response until the first top-level {...}
+    is balanced, then close the connection so generation stops early.
+    Brace depth ignores braces inside JSON string literals.
+    """
+    chunks = []
+    depth = 0
+    started = in_string = escaped = False
+    try:
+        async for line in response.aiter_lines():
+            if not line:
+                continue
+            part = json.loads(line)
+            text = part.get("response", "")
+            chunks.append(text)
+            for ch in text:
+                if in_string:
+                    if escaped:
+                        escaped = False
+                    elif ch == "\\":
+                        escaped = True
+                    elif ch == '"':
+                        in_string = False
+                elif ch == '"':
+                    in_string = started
+                elif ch == "{":
+                    depth += 1
+                    started = True
+                elif ch == "}" and started:
+                    depth -= 1
+                    if depth == 0:
+                        return "".join(chunks)
+            if part.get("done"):
+                break
+    finally:
+        await response.aclose()
+    return "".join(chunks)
+
+async def generate_scenario_from_text(user_input: str, no_cache: bool = False) -> dict:
+    """
+    Generate scenario from Ollama and auto-fix velocities.
+    Semantically similar earlier prompts are served from the scenario cache
+    unless no_cache=True.
+    """
+    use_cache = SEMANTIC_CACHE_AVAILABLE and not no_cache
+    if use_cache:
+        # The embedder (ONNX) runs in a worker thread so the event loop stays free
+        q = await asyncio.get_running_loop().run_in_executor(None, _embed_prompt, user_input)
+        cached = _cache_lookup(user_input, q)
+        if cached is not None:
+            return {"ok": True, "scenario": cached, "cached": True}
+
     try:
-        response = requests.post(
+        async with _ollama.stream(
+            "POST",
             OLLAMA_URL,
             json={
                 "model": MODEL,
                 "prompt": f"User wants to simulate: {user_input}\n\nGenerate the JSON:",
                 "system": SCENARIO_SYSTEM_PROMPT,
-                "stream": False,
+                "stream": True,
+                "keep_alive": OLLAMA_KEEP_ALIVE,
                 "options": {
                     "temperature": 0.1,
                     "num_predict": 2000,
                 }
             },
-            timeout=120
-        )
-        raw = response.json().get("response", "").strip()
-        raw = raw.replace("```json", "").replace("```", "").strip()
+        ) as response:
+            raw = (await read_streamed_json_object(response)).strip()
+        raw = _MARKDOWN_FENCE.sub("", raw).strip()
 
+        # Decode the first complete object; braces inside strings are safe
         start = raw.find("{")
-        end   = raw.rfind("}") + 1
-        if start == -1 or end == 0:
+        if start == -1:
             raise ValueError("No JSON found in response")
 
-        scenario = json.loads(raw[start:end])
+        scenario, _ = _JSON_DECODER.raw_decode(raw, start)
 
-        if "bodies" not in scenario or len(scenario["bodies"]) == 0:
-            raise ValueError("No bodies in scenario")
+        if VALIDATOR_AVAILABLE:
+            # Schema check + defaults, then AUTO-FIX VELOCITIES
+            checked = validate_scenario(scenario)
+            if not checked["ok"]:
+                raise ValueError(f"Invalid scenario: {checked['error']}")
+            scenario = fix_scenario_velocities(checked["scenario"])
+        else:
+            if "bodies" not in scenario or len(scenario["bodies"]) == 0:
+                raise ValueError("No bodies in scenario")
 
-        scenario.setdefault("units",       "solar")
-        scenario.setdefault("integrator",  "ias15")
-        scenario.setdefault("t_per_frame", 0.005)
-        scenario.setdefault("scale",       180.0)
+            scenario.setdefault("units",       "solar")
+            scenario.setdefault("integrator",  "ias15")
+            scenario.setdefault("t_per_frame", 0.005)
+            scenario.setdefault("scale",       180.0)
 
-        # AUTO-FIX VELOCITIES
-        if VALIDATOR_AVAILABLE:
-            scenario = fix_scenario_velocities(scenario)
+        if use_cache:
+            _cache_store(user_input, q, scenario)
+            await asyncio.get_running_loop().run_in_executor(None, _save_scenario_cache)
 
         return {"ok": True, "scenario": scenario}
 
@@ -148,6 +325,47 @@ def get_earth_moon_scenario():
     }
 
 
+def circular_vys(M: float, radii) -> np.ndarray:
+    """Circular orbital speeds v = 2π·sqrt(M/r) (AU/yr) for all radii at once."""
+    return 2 * math.pi * np.sqrt(M / np.asarray(radii, dtype=np.float64))
+
+
+def build_disk(M_star: float = 1.0, n: int = 20, r_min: float = 0.3, r_max: float = 3.0) -> dict:
+    """
+    Star + n planetesimals on prograde circular orbits — generated directly,
+    no LLM call. Radii are evenly spaced; phases follow the golden angle so
+    neighbours don't line up.
+    """
+    radii = np.linspace(r_min, r_max, n)
+    theta = np.arange(n) * (math.pi * (3 - math.sqrt(5)))
+    v     = circular_vys(M_star, radii)
+    cos, sin = np.cos(theta), np.sin(theta)
+    x, y   = radii * cos, radii * sin
+    vx, vy = -v * sin, v * cos
+
+    bodies = [{"name": "Protostar", "mass": M_star, "x": 0.0, "y": 0.0, "vx": 0.0, "vy": 0.0,
+               "color": "#fff200", "radius": 14, "type": "star"}]
+    for i in range(n):
+        bodies.append({
+            "name": f"Planetesimal {i + 1}", "mass": 1e-9,
+            "x": float(x[i]), "y": float(y[i]), "vx": float(vx[i]), "vy": float(vy[i]),
+            "color": "#c9a87c", "radius": 3, "type": "debris",
+        })
+
+    return {
+        "name": "Protoplanetary Disk",
+        "description": f"{n} planetesimals on circular orbits, {r_min}-{r_max} AU",
+        "units": "solar",
+        "integrator": "ias15",
+        "t_per_frame": 0.005,
+        "scale": 180.0 / max(r_max, 1.0),
+        "bodies": bodies,
+    }
+
+_DISK_REQUEST  = re.compile(r"(?:protoplanetary|debris)\s+disk|planetesimal")
+_DISK_COUNT    = re.compile(r"(\d+)\s+planetesimals?")
+
+
 KNOWN_SCENARIOS = {
     "solar system": {
         "name": "Solar System",
@@ -179,8 +397,9 @@ KNOWN_SCENARIOS = {
         ]
     },
 }
+_known_matcher = KeywordMatcher(KNOWN_SCENARIOS)
 
-def get_scenario(request: str) -> dict:
+async def get_scenario(request: str) -> dict:
     """
     Main entry point with automatic velocity validation.
     Returns scenario dict ready for REBOUND.
@@ -191,13 +410,20 @@ def get_scenario(request: str) -> dict:
     if "earth" in req_lower and "moon" in req_lower:
         return {"ok": True, "scenario": get_earth_moon_scenario(), "source": "builtin"}
 
-    # Check known scenarios
-    for key, val in KNOWN_SCENARIOS.items():
-        if key in req_lower:
-            return {"ok": True, "scenario": val, "source": "builtin"}
+    # Check known scenarios — one pass over the request, most specific (longest) key wins
+    matches = _known_matcher.findall(req_lower)
+    if matches:
+        key = max(matches, key=len)
+        return {"ok": True, "scenario": copy.deepcopy(KNOWN_SCENARIOS[key]), "source": "builtin"}
+
+    # Protoplanetary disks are built programmatically
+    if _DISK_REQUEST.search(req_lower):
+        count = _DISK_COUNT.search(req_lower)
+        n = min(int(count.group(1)), 200) if count else 20
+        return {"ok": True, "scenario": build_disk(n=max(n, 1)), "source": "builtin"}
 
     # AI generation with auto-fix
-    result = generate_scenario_from_text(request)
+    result = await generate_scenario_from_text(request)
     if result["ok"]:
         result["source"] = "ai"
     return result
@@ -210,7 +436,7 @@ if __name__ == "__main__":
     
     # Test Earth-Moon
     print("\n[Test 1] Earth-Moon System")
-    result = get_scenario("earth moon")
+    result = asyncio.run(get_scenario("earth moon"))
     if result["ok"]:
         moon = result["scenario"]["bodies"][1]
         print(f"  ✓ Moon velocity: {moon['vy']:.4f} AU/yr (correct!)")
@@ -1,26 +1,156 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
-import sys, os
+import asyncio
+import threading
+import sys, os, re
+from collections import OrderedDict
 
-sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+try:
+    import orjson
+    from fastapi.responses import ORJSONResponse
 
-app = FastAPI(title="Astro Thesaurus RAG API")
-app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])
+    class FastJSONResponse(ORJSONResponse):
+        """orjson encoder that also accepts numpy scalars/arrays in orbit data."""
+        def render(self, content) -> bytes:
+            return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY)
+except ImportError:
+    FastJSONResponse = JSONResponse
+
+# Project modules live next to this file; make them importable (once, ahead of
+# site-packages) even when the server is launched from another directory
+_HERE = os.path.dirname(os.path.abspath(__file__))
+if _HERE not in sys.path:
+    sys.path.insert(0, _HERE)
+
+# Full stack (requires query_rag, intent_parser, physics_engine, visualizer) —
+# imported once so the embedder and any module-level caches stay resident
+try:
+    from query_rag import query_rag_multi_async, is_orbital_query
+    from intent_parser import parse_intent_async, answer_with_rag_async, warmup as warmup_intent_model
+    from physics_engine import compute_orbit, compute_hohmann, compute_multi_orbit, SOLAR_SYSTEM, find_bodies
+    from visualizer import plot_orbit, plot_hohmann, plot_multi_orbit
+    RAG_AVAILABLE = True
+except Exception as e:
+    RAG_AVAILABLE = False
+    print(f"⚠️  Warning: RAG/physics modules not available ({e}) - using ChromaDB fallback")
+
+# Frontend origins (server_v2.js on :3000); override with a comma-separated
+# ASTRO_CORS_ORIGINS for other deployments. Preflights are cached for a day.
+CORS_ORIGINS = tuple(
+    o.strip() for o in os.environ.get(
+        "ASTRO_CORS_ORIGINS", "http://localhost:3000,http://127.0.0.1:3000"
+    ).split(",") if o.strip()
+)
+
+app = FastAPI(title="Astro Thesaurus RAG API", default_response_class=FastJSONResponse)
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=CORS_ORIGINS,
+    allow_methods=("GET", "POST"),
+    allow_headers=("content-type",),
+    max_age=86400,
+)
+
+
+# ── PLOT CACHE ───────────────────────────────────────────────
+# Plots are pure functions of their arguments, so each rendered base64 PNG is
+# kept and reused instead of re-running matplotlib on every chat request
+# (least recently used evicted past PLOT_CACHE_MAX). Rendering takes ~1 s, so
+# the chat handler calls these helpers through asyncio.to_thread; the cache is
+# shared with the pre-render thread, hence the lock.
+PLOT_CACHE = OrderedDict()
+PLOT_CACHE_MAX = 256
+_plot_cache_lock = threading.Lock()
+SOLAR_TOUR = ["mercury", "venus", "earth", "mars", "jupiter", "saturn"]
+
+def cached_plot(key, render):
+    """Return the cached plot for key, rendering (and storing) it on a miss."""
+    with _plot_cache_lock:
+        plot_b64 = PLOT_CACHE.get(key)
+        if plot_b64 is not None:
+            PLOT_CACHE.move_to_end(key)
+            return plot_b64
+    plot_b64 = render()
+    with _plot_cache_lock:
+        PLOT_CACHE[key] = plot_b64
+        while len(PLOT_CACHE) > PLOT_CACHE_MAX:
+            PLOT_CACHE.popitem(last=False)
+    return plot_b64
+
+def orbit_plot(body, duration, title):
+    orbit = compute_orbit(body, duration_days=duration)
+    return cached_plot(("orbit", body, duration, title), lambda: plot_orbit(orbit, title)), orbit
+
+def hohmann_plot(b1, b2):
+    transfer = compute_hohmann(b1, b2)
+    if not transfer:
+        return None, None
+    return cached_plot(("hohmann", b1, b2), lambda: plot_hohmann(transfer)), transfer
+
+def solar_tour_plot():
+    orbits = compute_multi_orbit(SOLAR_TOUR, duration_days=365)
+    if not orbits:
+        return None, None
+    return cached_plot(("multi", "solar_tour"),
+                       lambda: plot_multi_orbit(orbits, "Inner & Outer Solar System")), orbits
+
+
+def prerender_plots():
+    """Render the canonical plots into PLOT_CACHE (runs in a background thread)."""
+    try:
+        for body in SOLAR_SYSTEM:
+            orbit_plot(body, 365, f"{body.title()} — 365 Day Trajectory")
+            orbit_plot(body, 365, f"{body.title()} — Orbital Parameters")
+        hohmann_plot("earth", "mars")
+        solar_tour_plot()
+    except Exception as e:
+        print(f"⚠️  Warning: plot pre-render stopped ({e}) - remaining plots render on demand")
+
+
+@app.on_event("startup")
+async def warmup():
+    """
+    Load the embedding model and RAG index, and start loading the Ollama model
+    and pre-rendering canonical plots in the background — the server accepts
+    requests meanwhile, and a plot requested before it is cached renders on
+    demand in a worker thread.
+    """
+    if RAG_AVAILABLE:
+        warmup_intent_model()
+        from query_rag import _embedder, refresh_index
+        try:
+            _embedder(["warmup"])
+            refresh_index()
+        except Exception as e:
+            # Not fatal: the first query loads the index (and retries) instead
+            print(f"⚠️  Warning: RAG warmup failed ({e}) - index will load on first query")
+
+        threading.Thread(target=prerender_plots, name="plot-prerender", daemon=True).start()
 
 class ChatRequest(BaseModel):
     message: str
 
 
+# Fast path — greetings / help / empty messages never reach the embedder or LLM
+_GREETING = re.compile(r"^\s*(hi|hello|hey|help|\?|test)?\s*[!.?]*\s*$", re.I)
+MAX_MESSAGE_CHARS = 1000
+HELP_TEXT = ("Ask me about planet orbits, Hohmann transfers, Lagrange points, Kepler's laws, "
+             "exoplanets, comets or asteroids — e.g. \"What is Mars's orbital period?\"")
+
+
 @app.post("/api/chat")
 async def chat(req: ChatRequest):
     msg = req.message.strip()
+    if _GREETING.match(msg):
+        return {"text": HELP_TEXT, "plot": None, "data": None, "intent": None}
+    if len(msg) > MAX_MESSAGE_CHARS:
+        return {"text": f"Message too long — please keep questions under {MAX_MESSAGE_CHARS} characters.",
+                "plot": None, "data": None, "intent": None}
     try:
-        # Try full stack (requires query_rag, intent_parser, physics_engine, visualizer)
-        from query_rag import query_rag_multi, is_orbital_query
-        from intent_parser import parse_intent, answer_with_rag
-        from physics_engine import compute_orbit, compute_hohmann, compute_multi_orbit, SOLAR_SYSTEM
-        from visualizer import plot_orbit, plot_hohmann, plot_multi_orbit
+        if not RAG_AVAILABLE:
+            raise ImportError("RAG/physics modules not available")
 
         if not is_orbital_query(msg):
             return {
@@ -29,42 +159,40 @@ async def chat(req: ChatRequest):
                 "plot": None, "data": None, "intent": None
             }
 
-        intent   = parse_intent(msg)
-        rag_ctx  = query_rag_multi(msg)
-        text_ans = answer_with_rag(msg, rag_ctx) if rag_ctx else "No relevant data found in database."
+        # Intent parse (Ollama) and retrieval (embedding + index, in a worker
+        # thread) only need the message, so they overlap
+        intent, rag_ctx = await asyncio.gather(parse_intent_async(msg),
+                                               query_rag_multi_async(msg))
+        text_ans = await answer_with_rag_async(msg, rag_ctx) if rag_ctx else "No relevant data found in database."
 
         plot_b64 = None
         num_data = None
         body     = (intent.get("body") or "").lower()
         action   = (intent.get("action") or "").lower()
 
-        if intent.get("intent") in ["simulate", "plot"] and body in SOLAR_SYSTEM:
-            duration = intent.get("duration_days") or 365
-            orbit = compute_orbit(body, duration_days=int(duration))
-            if orbit:
-                plot_b64 = plot_orbit(orbit, f"{body.title()} — {int(duration)} Day Trajectory")
-                num_data = orbit["elements"]
-        elif "transfer" in action or "hohmann" in msg.lower():
-            bodies = [b for b in SOLAR_SYSTEM if b in msg.lower()]
+        # Transfers first: their intent also names the target body
+        if "transfer" in action or "hohmann" in msg.lower():
+            bodies = find_bodies(msg)
             b1 = bodies[0] if bodies else "earth"
             b2 = bodies[1] if len(bodies) > 1 else "mars"
-            transfer = compute_hohmann(b1, b2)
+            plot_b64, transfer = await asyncio.to_thread(hohmann_plot, b1, b2)
             if transfer:
-                plot_b64 = plot_hohmann(transfer)
                 num_data = {k: transfer[k] for k in
                             ["from","to","transfer_days","delta_v1","delta_v2","total_delta_v"]
                             if k in transfer}
+        elif intent.get("intent") in ["simulate", "plot"] and body in SOLAR_SYSTEM:
+            duration = int(intent.get("duration_days") or 365)
+            plot_b64, orbit = await asyncio.to_thread(
+                orbit_plot, body, duration, f"{body.title()} — {duration} Day Trajectory")
+            num_data = orbit["elements"]
         elif "solar system" in msg.lower() or "all planets" in msg.lower():
-            orbits = compute_multi_orbit(
-                ["mercury","venus","earth","mars","jupiter","saturn"], duration_days=365)
+            plot_b64, orbits = await asyncio.to_thread(solar_tour_plot)
             if orbits:
-                plot_b64 = plot_multi_orbit(orbits, "Inner & Outer Solar System")
                 num_data = {p["body"]: p["elements"] for p in orbits}
         elif body in SOLAR_SYSTEM:
-            orbit = compute_orbit(body, duration_days=365)
-            if orbit:
-                plot_b64 = plot_orbit(orbit, f"{body.title()} — Orbital Parameters")
-                num_data = orbit["elements"]
+            plot_b64, orbit = await asyncio.to_thread(
+                orbit_plot, body, 365, f"{body.title()} — Orbital Parameters")
+            num_data = orbit["elements"]
 
         return {"text": text_ans, "plot": plot_b64, "data": num_data, "intent": intent}
 
@@ -120,12 +248,10 @@ async def health():
 
 @app.get("/api/bodies")
 async def get_bodies():
-    try:
-        from physics_engine import SOLAR_SYSTEM
+    if RAG_AVAILABLE:
         return {"bodies": list(SOLAR_SYSTEM.keys())}
-    except Exception:
-        return {"bodies": ["sun","mercury","venus","earth","mars",
-                           "jupiter","saturn","uranus","neptune"]}
+    return {"bodies": ["sun","mercury","venus","earth","mars",
+                       "jupiter","saturn","uranus","neptune"]}
 
 
 @app.get("/")
@@ -1,8 +1,38 @@
 import json
 import csv
+import hashlib
+import itertools
 import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 import chromadb
 
+try:
+    import numpy as np
+    import pandas as pd
+    PANDAS_AVAILABLE = True
+except ImportError:
+    PANDAS_AVAILABLE = False
+
+try:
+    import ijson
+    IJSON_AVAILABLE = True
+except ImportError:
+    IJSON_AVAILABLE = False
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# Chroma insert throughput plateaus around 100-250 docs per add(); larger
+# batches only grow embedding memory and the SQLite statement size
+CHROMA_BATCH = 166
+ADD_WORKERS = 4
+
 print("=" * 50)
 print("ASTRO THESAURUS — RAG DATABASE BUILDER")
 print("Domain: Orbital Dynamics Only")
@@ -11,314 +41,389 @@ print("=" * 50)
 # Initialize ChromaDB
 client = chromadb.PersistentClient(path="./chroma_db")
 
-# Delete existing collection if rebuilding
-try:
-    client.delete_collection("orbital_dynamics")
-    print("Cleared existing database")
-except:
-    pass
-
-collection = client.create_collection(
-    name="orbital_dynamics",
-    metadata={"description": "Orbital mechanics and dynamics knowledge base"}
-)
+# ── SKIP IF UNCHANGED ────────────────────────────────────────
+# Rebuilding re-embeds every document and rebuilds the HNSW index, so it is
+# skipped when no input (or this script) changed since the last build —
+# judged by size + mtime. The fingerprint is stamped into the collection's own
+# metadata once a build completes, so a partial build, or a collection that
+# rebuild_balanced.py or anything else put under the same name, never matches.
+# --force rebuilds.
+FINGERPRINT_KEY = "build_fingerprint"
+COLLECTION_METADATA = {"description": "Orbital mechanics and dynamics knowledge base"}
+BUILD_INPUTS = [
+    "datasets/UAT.json",
+    "datasets/exoplanets.csv",
+    "datasets/planets_horizons.json",
+    "datasets/asteroids.json",
+    "datasets/small_body.json",
+    "datasets/trojan.json",
+    "datasets/comet.json",
+    os.path.abspath(__file__),
+]
+
+
+def build_fingerprint():
+    h = hashlib.sha256()
+    for path in BUILD_INPUTS:
+        try:
+            st = os.stat(path)
+            h.update(f"{path}:{st.st_size}:{st.st_mtime_ns}\n".encode())
+        except OSError:
+            h.update(f"{path}:missing\n".encode())
+    return h.hexdigest()
+
+
+current_fingerprint = build_fingerprint()
+up_to_date = False
+if "--force" not in sys.argv:
+    try:
+        collection = client.get_collection("orbital_dynamics")
+        up_to_date = (collection.metadata or {}).get(FINGERPRINT_KEY) == current_fingerprint
+    except Exception:
+        pass
+
+if up_to_date:
+    print("\nDatasets unchanged since last build — skipping rebuild (pass --force to rebuild)")
+else:
+    # Delete existing collection if rebuilding
+    try:
+        client.delete_collection("orbital_dynamics")
+        print("Cleared existing database")
+    except:
+        pass
+
+    collection = client.create_collection(
+        name="orbital_dynamics",
+        metadata=COLLECTION_METADATA
+    )
 
-documents = []
-metadatas = []
-ids = []
-doc_id = 0
+
+def add_batch(docs, metas, batch_ids):
+    """collection.add() one batch and return its throughput in docs/sec."""
+    t0 = time.perf_counter()
+    collection.add(documents=docs, metadatas=metas, ids=batch_ids)
+    elapsed = time.perf_counter() - t0
+    return len(docs) / elapsed if elapsed > 0 else float("inf")
+
+
+# The dataset files are independent, so they are read concurrently ahead of
+# the sections that consume them (see prefetch below); a section that finds
+# no prefetched result just loads its file inline.
+_io_pool = ThreadPoolExecutor(max_workers=6)
+_pending_loads = {}
+
+
+def prefetch(path, loader, *args):
+    _pending_loads[path] = _io_pool.submit(loader, path, *args)
+
+
+def take_loaded(path, loader, *args):
+    future = _pending_loads.pop(path, None)
+    return future.result() if future else loader(path, *args)
+
+
+# UAT concepts kept for the orbital dynamics domain (substring of the name)
+_UAT_KEYWORDS = ("orbit", "dynamics", "kepler", "gravity")
+
+# Exoplanet classification thresholds
+HOT_JUPITER_MAX_A = 0.1          # AU
+HOT_JUPITER_MIN_MASS = 0.3       # Jupiter masses
+SMALL_PLANET_MAX_MASS = 0.1      # Jupiter masses
+HABITABLE_ZONE_A = (0.95, 1.37)  # AU
+
+# Field labels for the SBDB sections, in output order
+_AST_LABELS = {
+    "a": "Semi-major axis (AU)",
+    "e": "Eccentricity",
+    "i": "Inclination (deg)",
+    "per": "Orbital period (days)",
+    "moid": "Min orbit intersection distance (AU)",
+    "class": "Orbital class"
+}
+_SB_LABELS = {
+    "a": "Semi-major axis (AU)",
+    "e": "Eccentricity",
+    "i": "Inclination (deg)",
+    "per": "Orbital period (days)",
+    "moid": "Min orbit intersection distance",
+    "class": "Object class"
+}
+_TJ_LABELS = {"a":"Semi-major axis (AU)","e":"Eccentricity","i":"Inclination (deg)","per":"Period (days)"}
+_CM_LABELS = {"a":"Semi-major axis (AU)","e":"Eccentricity","i":"Inclination (deg)","per":"Period (days)","class":"Comet class"}
+
+
+def load_json(path):
+    """Parse a dataset JSON file (orjson when installed — several of these are tens of MB)."""
+    if ORJSON_AVAILABLE:
+        with open(path, "rb") as f:
+            return orjson.loads(f.read())
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_sbdb_rows(path, limit=None):
+    """
+    (fields, data rows) of an SBDB query dump, optionally only the first
+    `limit` rows. With ijson a capped read streams the rows and stops after
+    `limit`, so the rest of the file is never decoded.
+    """
+    if limit is not None and IJSON_AVAILABLE:
+        with open(path, "rb") as f:
+            # "fields" precedes "data" in SBDB output, so this stops near the top
+            fields = next(ijson.items(f, "fields"), [])
+            f.seek(0)
+            rows = list(itertools.islice(ijson.items(f, "data.item"), limit))
+        return fields, rows
+    data = load_json(path)
+    return data.get("fields", []), data.get("data", [])[:limit]
+
+
+# Each dataset section is a generator of (document, metadata, id) tuples; they
+# are chained and streamed into Chroma CHROMA_BATCH at a time, so no section
+# accumulates its rows in memory first.
 
 # ── DATASET 1: UAT Concepts ──────────────────────────────────
 # ── DATASET 1: UAT Concepts (FIXED) ──────────────────────────
-print("\n[1/7] Processing UAT.json...")
-try:
-    with open("datasets/UAT.json", "r", encoding="utf-8") as f:
-        uat_data = json.load(f)
-
-    def flatten_uat(nodes, results):
-        for node in nodes:
-            name = node.get("name", "")
-            definition = node.get("definition") or ""
-            # Only keep it if it's related to orbital dynamics
-            if any(k in name.lower() for k in ["orbit", "dynamics", "kepler", "gravity"]):
-                results.append(f"CONCEPT: {name}\nDEFINITION: {definition}\nDOMAIN: orbital_dynamics")
-            if "children" in node and node["children"]:
-                flatten_uat(node["children"], results)
-
-    uat_docs = []
-    flatten_uat(uat_data.get("children", []), uat_docs)
-    
-    for i, doc in enumerate(uat_docs):
-        documents.append(doc)
-        metadatas.append({"source": "UAT", "type": "thesaurus"})
-        ids.append(f"uat_{i}")
-    
-    print(f"    Added {len(uat_docs)} orbital dynamics concepts from UAT")
-except Exception as e:
-    print(f"    Error: {e}")
+def iter_uat():
+    print("\n[1/7] Processing UAT.json...")
+    try:
+        uat_data = take_loaded("datasets/UAT.json", load_json)
+
+        def flatten_uat(nodes, results):
+            # Explicit stack instead of recursion: no call per node and no
+            # recursion limit on deep branches; children are pushed reversed
+            # so the output keeps the same depth-first pre-order (and uat_<i> ids)
+            stack = deque(reversed(nodes))
+            while stack:
+                node = stack.pop()
+                name = node.get("name", "")
+                # Only keep it if it's related to orbital dynamics
+                name_lower = name.lower()
+                if any(k in name_lower for k in _UAT_KEYWORDS):
+                    definition = node.get("definition") or ""
+                    results.append(f"CONCEPT: {name}\nDEFINITION: {definition}\nDOMAIN: orbital_dynamics")
+                children = node.get("children")
+                if children:
+                    stack.extend(reversed(children))
+
+        uat_docs = []
+        flatten_uat(uat_data.get("children", []), uat_docs)
+
+        for i, doc in enumerate(uat_docs):
+            yield doc, {"source": "UAT", "type": "thesaurus"}, f"uat_{i}"
+
+        print(f"    Added {len(uat_docs)} orbital dynamics concepts from UAT")
+    except Exception as e:
+        print(f"    Error: {e}")
 
 # ── DATASET 2: Exoplanets ────────────────────────────────────
-print("\n[2/7] Processing exoplanets.csv...")
-try:
-    exo_count = 0
-    with open("datasets/exoplanets.csv", "r", encoding="utf-8") as f:
+EXO_COLUMNS = ["pl_name", "pl_orbsmax", "pl_orbeccen", "pl_bmassj", "pl_rade", "hostname", "st_teff"]
+EXO_TYPES = (
+    "TYPE: Hot Jupiter — gas giant in close orbit",
+    "TYPE: Super Earth or Neptune-sized planet",
+    "TYPE: Potentially in habitable zone",
+)
+
+
+def classify_exoplanets(a, m):
+    """Vectorized type line per row ("" if unclassified); a, m are float Series (NaN = missing)."""
+    # `!= 0` mirrors the truthiness checks of the scalar rules; NaN fails every comparison
+    return np.select(
+        [(a != 0) & (a < HOT_JUPITER_MAX_A) & (m > HOT_JUPITER_MIN_MASS),
+         (m != 0) & (m < SMALL_PLANET_MAX_MASS),
+         (a > HABITABLE_ZONE_A[0]) & (a < HABITABLE_ZONE_A[1])],
+        EXO_TYPES, default="")
+
+
+def classify_exoplanet(a, mass):
+    """Scalar version of classify_exoplanets for the csv fallback."""
+    try:
+        a_val = float(a) if a else None
+        m_val = float(mass) if mass else None
+        if a_val and a_val < HOT_JUPITER_MAX_A and m_val and m_val > HOT_JUPITER_MIN_MASS:
+            return EXO_TYPES[0]
+        elif m_val and m_val < SMALL_PLANET_MAX_MASS:
+            return EXO_TYPES[1]
+        elif a_val and HABITABLE_ZONE_A[0] < a_val < HABITABLE_ZONE_A[1]:
+            return EXO_TYPES[2]
+    except:
+        pass
+    return ""
+
+
+def read_exoplanets(path):
+    """Yield (name, host, a, e, mass, radius, teff, type_line) string tuples per named row."""
+    if PANDAS_AVAILABLE:
+        df = pd.read_csv(path, comment="#", usecols=EXO_COLUMNS, dtype=str, keep_default_na=False)
+        df = df.apply(lambda col: col.str.strip())
+        df = df[df["pl_name"] != ""]
+        types = classify_exoplanets(pd.to_numeric(df["pl_orbsmax"], errors="coerce"),
+                                    pd.to_numeric(df["pl_bmassj"], errors="coerce"))
+        yield from zip(df["pl_name"], df["hostname"], df["pl_orbsmax"], df["pl_orbeccen"],
+                       df["pl_bmassj"], df["pl_rade"], df["st_teff"], types)
+        return
+
+    with open(path, "r", encoding="utf-8") as f:
         # Skip comment lines starting with #
         lines = [l for l in f if not l.startswith("#")]
 
-    reader = csv.DictReader(lines)
-    batch = []
-
-    for row in reader:
-        name = row.get("pl_name", "").strip()
+    for row in csv.DictReader(lines):
+        name, a, e, mass, radius, host, teff = (row.get(c, "").strip() for c in EXO_COLUMNS)
         if not name:
             continue
+        yield name, host, a, e, mass, radius, teff, classify_exoplanet(a, mass)
 
-        a = row.get("pl_orbsmax", "").strip()
-        e = row.get("pl_orbeccen", "").strip()
-        mass = row.get("pl_bmassj", "").strip()
-        radius = row.get("pl_rade", "").strip()
-        host = row.get("hostname", "").strip()
-        teff = row.get("st_teff", "").strip()
-
-        doc_text = f"EXOPLANET: {name}\n"
-        doc_text += f"HOST STAR: {host}\n"
-        if a: doc_text += f"SEMI-MAJOR AXIS: {a} AU\n"
-        if e: doc_text += f"ECCENTRICITY: {e}\n"
-        if mass: doc_text += f"MASS: {mass} Jupiter masses\n"
-        if radius: doc_text += f"RADIUS: {radius} Earth radii\n"
-        if teff: doc_text += f"HOST STAR TEMPERATURE: {teff} K\n"
-
-        # Classify type
-        try:
-            a_val = float(a) if a else None
-            m_val = float(mass) if mass else None
-            if a_val and a_val < 0.1 and m_val and m_val > 0.3:
-                doc_text += "TYPE: Hot Jupiter — gas giant in close orbit\n"
-            elif m_val and m_val < 0.1:
-                doc_text += "TYPE: Super Earth or Neptune-sized planet\n"
-            elif a_val and 0.95 < a_val < 1.37:
-                doc_text += "TYPE: Potentially in habitable zone\n"
-        except:
-            pass
-
-        doc_text += "DOMAIN: orbital_dynamics\n"
-        batch.append((doc_text, {"source": "NASA_exoplanet", "planet": name, "type": "exoplanet"}, f"exo_{doc_id}"))
-        doc_id += 1
-        exo_count += 1
-
-        # Add in batches of 500
-        if len(batch) >= 500:
-            collection.add(
-                documents=[b[0] for b in batch],
-                metadatas=[b[1] for b in batch],
-                ids=[b[2] for b in batch]
-            )
-            batch = []
-
-    if batch:
-        documents_batch = [b[0] for b in batch]
-        metadatas_batch = [b[1] for b in batch]
-        ids_batch = [b[2] for b in batch]
-        collection.add(documents=documents_batch, metadatas=metadatas_batch, ids=ids_batch)
-
-    print(f"    Added {exo_count} exoplanets")
 
-except Exception as e:
-    print(f"    Error: {e}")
+def iter_exoplanets():
+    print("\n[2/7] Processing exoplanets.csv...")
+    try:
+        exo_count = 0
+        for name, host, a, e, mass, radius, teff, type_line in read_exoplanets("datasets/exoplanets.csv"):
+            parts = [f"EXOPLANET: {name}", f"HOST STAR: {host}"]
+            if a: parts.append(f"SEMI-MAJOR AXIS: {a} AU")
+            if e: parts.append(f"ECCENTRICITY: {e}")
+            if mass: parts.append(f"MASS: {mass} Jupiter masses")
+            if radius: parts.append(f"RADIUS: {radius} Earth radii")
+            if teff: parts.append(f"HOST STAR TEMPERATURE: {teff} K")
+            if type_line: parts.append(type_line)
 
-# ── DATASET 3: Planets (Horizons) ────────────────────────────
-print("\n[3/7] Processing planets_horizons.json...")
-try:
-    with open("datasets/planets_horizons.json", "r", encoding="utf-8") as f:
-        planets_data = json.load(f)
+            parts.append("DOMAIN: orbital_dynamics")
+            doc_text = "\n".join(parts) + "\n"
+            yield doc_text, {"source": "NASA_exoplanet", "planet": name, "type": "exoplanet"}, f"exo_{exo_count}"
+            exo_count += 1
 
-    planet_count = 0
-    for planet_name, data in planets_data.items():
-        result_text = data.get("result", "")
+        print(f"    Added {exo_count} exoplanets")
 
-        doc_text = f"SOLAR SYSTEM BODY: {planet_name.title()}\n"
-        doc_text += f"DATA SOURCE: NASA JPL Horizons\n"
-        doc_text += f"RAW DATA: {result_text[:800]}\n"
-        doc_text += "DOMAIN: orbital_dynamics\n"
+    except Exception as e:
+        print(f"    Error: {e}")
 
-        documents.append(doc_text)
-        metadatas.append({"source": "JPL_Horizons", "body": planet_name, "type": "planet"})
-        ids.append(f"planet_{doc_id}")
-        doc_id += 1
-        planet_count += 1
+# ── DATASET 3: Planets (Horizons) ────────────────────────────
+def iter_planets():
+    print("\n[3/7] Processing planets_horizons.json...")
+    try:
+        planets_data = take_loaded("datasets/planets_horizons.json", load_json)
+
+        planet_count = 0
+        for planet_name in list(planets_data):
+            # Keep only the 800-char excerpt; popping the entry releases the
+            # full Horizons response while the remaining planets are processed
+            result_text = (planets_data.pop(planet_name).get("result") or "")[:800]
+
+            doc_text = (
+                f"SOLAR SYSTEM BODY: {planet_name.title()}\n"
+                f"DATA SOURCE: NASA JPL Horizons\n"
+                f"RAW DATA: {result_text}\n"
+                "DOMAIN: orbital_dynamics\n"
+            )
 
-    print(f"    Added {planet_count} planets")
+            yield doc_text, {"source": "JPL_Horizons", "body": planet_name, "type": "planet"}, f"planet_{planet_count}"
+            planet_count += 1
 
-except Exception as e:
-    print(f"    Error: {e}")
+        print(f"    Added {planet_count} planets")
 
-# ── DATASET 4: Asteroids ─────────────────────────────────────
-print("\n[4/7] Processing asteroids.json...")
-try:
-    with open("datasets/asteroids.json", "r", encoding="utf-8") as f:
-        ast_data = json.load(f)
+    except Exception as e:
+        print(f"    Error: {e}")
 
-    fields = ast_data.get("fields", [])
-    data_rows = ast_data.get("data", [])
-    ast_count = 0
-
-    for row in data_rows[:1000]:
-        if len(row) != len(fields):
-            continue
-        obj = dict(zip(fields, row))
-        name = obj.get("full_name", "Unknown")
-
-        doc_text = f"ASTEROID: {name}\n"
-        for field in ["a", "e", "i", "per", "moid", "class"]:
-            if obj.get(field):
-                labels = {
-                    "a": "Semi-major axis (AU)",
-                    "e": "Eccentricity",
-                    "i": "Inclination (deg)",
-                    "per": "Orbital period (days)",
-                    "moid": "Min orbit intersection distance (AU)",
-                    "class": "Orbital class"
-                }
-                doc_text += f"{labels[field]}: {obj[field]}\n"
-        doc_text += "DOMAIN: orbital_dynamics\n"
-
-        documents.append(doc_text)
-        metadatas.append({"source": "JPL_SBDB", "body": name, "type": "asteroid"})
-        ids.append(f"ast_{doc_id}")
-        doc_id += 1
-        ast_count += 1
-
-    print(f"    Added {ast_count} asteroids")
-
-except Exception as e:
-    print(f"    Error: {e}")
-
-# ── DATASET 5: Small Bodies ──────────────────────────────────
-print("\n[5/7] Processing small_body.json...")
-try:
-    with open("datasets/small_body.json", "r", encoding="utf-8") as f:
-        sb_data = json.load(f)
+def render_sbdb(obj, header, labels):
+    """Document text for one SBDB row: header lines, then each non-empty labelled field."""
+    parts = list(header)
+    for field, label in labels.items():
+        value = obj.get(field)
+        if value:
+            parts.append(f"{label}: {value}")
+    parts.append("DOMAIN: orbital_dynamics")
+    return "\n".join(parts) + "\n"
 
-    fields = sb_data.get("fields", [])
-    data_rows = sb_data.get("data", [])
-    sb_count = 0
 
-    for row in data_rows[:1000]:
-        if len(row) != len(fields):
-            continue
-        obj = dict(zip(fields, row))
-        name = obj.get("full_name", "Unknown")
-
-        doc_text = f"SMALL BODY: {name}\n"
-        for field in ["a", "e", "i", "per", "moid", "class"]:
-            if obj.get(field):
-                labels = {
-                    "a": "Semi-major axis (AU)",
-                    "e": "Eccentricity",
-                    "i": "Inclination (deg)",
-                    "per": "Orbital period (days)",
-                    "moid": "Min orbit intersection distance",
-                    "class": "Object class"
-                }
-                doc_text += f"{labels[field]}: {obj[field]}\n"
-        doc_text += "DOMAIN: orbital_dynamics\n"
-
-        documents.append(doc_text)
-        metadatas.append({"source": "JPL_SBDB", "body": name, "type": "small_body"})
-        ids.append(f"sb_{doc_id}")
-        doc_id += 1
-        sb_count += 1
-
-    print(f"    Added {sb_count} small bodies")
-
-except Exception as e:
-    print(f"    Error: {e}")
+def iter_sbdb(step, path, limit, title, extra_header, labels, body_type, id_prefix, noun):
+    """Shared generator for the four SBDB sections (datasets 4-7)."""
+    print(f"\n[{step}/7] Processing {os.path.basename(path)}...")
+    try:
+        fields, data_rows = take_loaded(path, load_sbdb_rows, limit)
+        count = 0
 
-# ── DATASET 6: Trojans ───────────────────────────────────────
-print("\n[6/7] Processing trojan.json...")
-try:
-    with open("datasets/trojan.json", "r", encoding="utf-8") as f:
-        tj_data = json.load(f)
+        for row in data_rows:
+            if len(row) != len(fields):
+                continue
+            obj = dict(zip(fields, row))
+            name = obj.get("full_name", "Unknown")
 
-    fields = tj_data.get("fields", [])
-    data_rows = tj_data.get("data", [])
-    tj_count = 0
+            doc_text = render_sbdb(obj, (f"{title}: {name}",) + extra_header, labels)
+            yield doc_text, {"source": "JPL_SBDB", "body": name, "type": body_type}, f"{id_prefix}_{count}"
+            count += 1
 
-    for row in data_rows:
-        if len(row) != len(fields):
-            continue
-        obj = dict(zip(fields, row))
-        name = obj.get("full_name", "Unknown")
+        print(f"    Added {count} {noun}")
 
-        doc_text = f"JUPITER TROJAN ASTEROID: {name}\n"
-        doc_text += "ORBITAL TYPE: Trojan — librates around L4 or L5 Lagrange point\n"
-        for field in ["a", "e", "i", "per"]:
-            if obj.get(field):
-                labels = {"a":"Semi-major axis (AU)","e":"Eccentricity","i":"Inclination (deg)","per":"Period (days)"}
-                doc_text += f"{labels[field]}: {obj[field]}\n"
-        doc_text += "DOMAIN: orbital_dynamics\n"
+    except Exception as e:
+        print(f"    Error: {e}")
 
-        documents.append(doc_text)
-        metadatas.append({"source": "JPL_SBDB", "body": name, "type": "trojan"})
-        ids.append(f"tj_{doc_id}")
-        doc_id += 1
-        tj_count += 1
+# ── DATASET 4: Asteroids ─────────────────────────────────────
+def iter_asteroids():
+    return iter_sbdb(4, "datasets/asteroids.json", 1000, "ASTEROID", (),
+                     _AST_LABELS, "asteroid", "ast", "asteroids")
 
-    print(f"    Added {tj_count} Trojan asteroids")
+# ── DATASET 5: Small Bodies ──────────────────────────────────
+def iter_small_bodies():
+    return iter_sbdb(5, "datasets/small_body.json", 1000, "SMALL BODY", (),
+                     _SB_LABELS, "small_body", "sb", "small bodies")
 
-except Exception as e:
-    print(f"    Error: {e}")
+# ── DATASET 6: Trojans ───────────────────────────────────────
+def iter_trojans():
+    return iter_sbdb(6, "datasets/trojan.json", None, "JUPITER TROJAN ASTEROID",
+                     ("ORBITAL TYPE: Trojan — librates around L4 or L5 Lagrange point",),
+                     _TJ_LABELS, "trojan", "tj", "Trojan asteroids")
 
 # ── DATASET 7: Comets ────────────────────────────────────────
-print("\n[7/7] Processing comet.json...")
-try:
-    with open("datasets/comet.json", "r", encoding="utf-8") as f:
-        cm_data = json.load(f)
-
-    fields = cm_data.get("fields", [])
-    data_rows = cm_data.get("data", [])
-    cm_count = 0
-
-    for row in data_rows:
-        if len(row) != len(fields):
-            continue
-        obj = dict(zip(fields, row))
-        name = obj.get("full_name", "Unknown")
-
-        doc_text = f"COMET: {name}\n"
-        doc_text += "OBJECT TYPE: Comet — icy small body with highly eccentric orbit\n"
-        for field in ["a", "e", "i", "per", "class"]:
-            if obj.get(field):
-                labels = {"a":"Semi-major axis (AU)","e":"Eccentricity","i":"Inclination (deg)","per":"Period (days)","class":"Comet class"}
-                doc_text += f"{labels[field]}: {obj[field]}\n"
-        doc_text += "DOMAIN: orbital_dynamics\n"
-
-        documents.append(doc_text)
-        metadatas.append({"source": "JPL_SBDB", "body": name, "type": "comet"})
-        ids.append(f"cm_{doc_id}")
-        doc_id += 1
-        cm_count += 1
-
-    print(f"    Added {cm_count} comets")
-
-except Exception as e:
-    print(f"    Error: {e}")
-
-# ── ADD ALL REMAINING DOCS TO CHROMADB ───────────────────────
-print("\nAdding all documents to ChromaDB...")
-BATCH_SIZE = 500
-for i in range(0, len(documents), BATCH_SIZE):
-    collection.add(
-        documents=documents[i:i+BATCH_SIZE],
-        metadatas=metadatas[i:i+BATCH_SIZE],
-        ids=ids[i:i+BATCH_SIZE]
+def iter_comets():
+    return iter_sbdb(7, "datasets/comet.json", None, "COMET",
+                     ("OBJECT TYPE: Comet — icy small body with highly eccentric orbit",),
+                     _CM_LABELS, "comet", "cm", "comets")
+
+# ── STREAM ALL DOCS INTO CHROMADB ────────────────────────────
+inserted = 0
+
+
+def report(n, future):
+    global inserted
+    rate = future.result()
+    inserted += n
+    print(f"    Inserted {inserted} documents ({rate:.1f} docs/sec/worker)...")
+
+
+if not up_to_date:
+    prefetch("datasets/UAT.json", load_json)
+    prefetch("datasets/planets_horizons.json", load_json)
+    prefetch("datasets/asteroids.json", load_sbdb_rows, 1000)
+    prefetch("datasets/small_body.json", load_sbdb_rows, 1000)
+    prefetch("datasets/trojan.json", load_sbdb_rows, None)
+    prefetch("datasets/comet.json", load_sbdb_rows, None)
+
+    print("\nStreaming all documents into ChromaDB...")
+    all_docs = itertools.chain(
+        iter_uat(), iter_exoplanets(), iter_planets(), iter_asteroids(),
+        iter_small_bodies(), iter_trojans(), iter_comets()
     )
-    print(f"    Inserted {min(i+BATCH_SIZE, len(documents))}/{len(documents)} documents...")
+    # Batches are built here on the main thread (the generators are not
+    # thread-safe) and handed to ADD_WORKERS concurrent add() calls, so embedding
+    # one batch overlaps with the SQLite commit of another. At most
+    # 2 * ADD_WORKERS batches are in flight to keep memory bounded.
+    with ThreadPoolExecutor(max_workers=ADD_WORKERS) as pool:
+        pending = deque()
+        while chunk := list(itertools.islice(all_docs, CHROMA_BATCH)):
+            future = pool.submit(add_batch, [c[0] for c in chunk], [c[1] for c in chunk], [c[2] for c in chunk])
+            pending.append((len(chunk), future))
+            if len(pending) >= 2 * ADD_WORKERS:
+                report(*pending.popleft())
+        while pending:
+            report(*pending.popleft())
+
+    _io_pool.shutdown()
+    collection.modify(metadata={**COLLECTION_METADATA, FINGERPRINT_KEY: current_fingerprint})
 
 # ── SUMMARY ──────────────────────────────────────────────────
 total = collection.count()
 print("\n" + "=" * 50)
-print("RAG DATABASE BUILT SUCCESSFULLY!")
+print("RAG DATABASE UP TO DATE" if up_to_date else "RAG DATABASE BUILT SUCCESSFULLY!")
 print(f"Total documents in database: {total}")
 print(f"Database location: ./chroma_db/")
 print("=" * 50)
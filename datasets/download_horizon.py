@@ -1,6 +1,12 @@
-import urllib.request
+import asyncio
+import httpx
 import json
-import time
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
 
 planets = {
     "mercury": "199",
@@ -13,21 +19,35 @@ planets = {
     "neptune": "899"
 }
 
-all_data = {}
+# At most this many requests in flight at once, to stay polite to JPL
+MAX_CONCURRENT = 4
+
 
-for name, id in planets.items():
-    print(f"Downloading {name}...")
+async def fetch(client, sem, name, id):
     url = f"https://ssd.jpl.nasa.gov/api/horizons.api?format=json&COMMAND='{id}'&OBJ_DATA='YES'&MAKE_EPHEM='NO'"
-    try:
-        with urllib.request.urlopen(url, timeout=30) as response:
-            data = json.loads(response.read())
-            all_data[name] = data
+    async with sem:
+        print(f"Downloading {name}...")
+        try:
+            response = await client.get(url)
+            response.raise_for_status()
             print(f"  {name} done")
-    except Exception as e:
-        print(f"  {name} failed: {e}")
-    time.sleep(1)
+            return name, orjson.loads(response.content) if ORJSON_AVAILABLE else response.json()
+        except Exception as e:
+            print(f"  {name} failed: {e}")
+            return name, None
+
+
+async def main():
+    sem = asyncio.Semaphore(MAX_CONCURRENT)
+    async with httpx.AsyncClient(timeout=30) as client:
+        results = await asyncio.gather(*[fetch(client, sem, name, id) for name, id in planets.items()])
+    # gather keeps submission order, so the file stays in planet order
+    return {name: data for name, data in results if data is not None}
+
+
+all_data = asyncio.run(main())
 
 with open('datasets/planets_horizons.json', 'w') as f:
     json.dump(all_data, f, indent=2)
 
-print("All planets downloaded!")
\ No newline at end of file
+print("All planets downloaded!")
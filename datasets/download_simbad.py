@@ -3,6 +3,9 @@ from astroquery.simbad import Simbad
 print("Downloading Simbad star catalog...")
 
 # New TAP query syntax (replaces deprecated query_criteria)
+# Nearby (parallax > 10 mas) typed stars with a measured V magnitude; the inner
+# joins are the filter. A single round-trip unless it fails, in which case the
+# reduced M-dwarf query below is tried instead.
 query = """
 SELECT TOP 3000
     basic.main_id,
@@ -6,7 +6,13 @@ EMERGENCY FIX - Windows Compatible
 
 import os
 import sys
-from datetime import datetime
+
+from patch_utils import backup_file, read_source, write_source
+from text_match import KeywordMatcher
+
+OLD_MOON_VY = '"vy": 6.396'
+# Every sentinel the fix checks for, found in one scan of the file
+SENTINELS = KeywordMatcher([OLD_MOON_VY, 'scenario_validator'])
 
 def find_ai_generator():
     candidates = ['ai_scenario_generator.py', 'ai_scenario_generator_final.py', 'ai_scenario_generator_fixed.py']
@@ -18,34 +24,17 @@ def find_ai_generator():
             return f
     return None
 
-def backup_file(filepath):
-    backup = f"{filepath}.backup.{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-    try:
-        with open(filepath, 'r', encoding='utf-8') as src:
-            with open(backup, 'w', encoding='utf-8') as dst:
-                dst.write(src.read())
-    except:
-        with open(filepath, 'r', encoding='latin-1') as src:
-            with open(backup, 'w', encoding='utf-8') as dst:
-                dst.write(src.read())
-    print(f"  ✓ Backed up {filepath}")
-    return True
-
 def fix_moon_velocity(filepath):
-    try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            content = f.read()
-    except:
-        with open(filepath, 'r', encoding='latin-1') as f:
-            content = f.read()
+    content = read_source(filepath)
+    hits = SENTINELS.findall(content)
     
     changes = 0
-    if '"vy": 6.396' in content:
-        content = content.replace('"vy": 6.396', '"vy": 0.2148')
+    if OLD_MOON_VY in hits:
+        content = content.replace(OLD_MOON_VY, '"vy": 0.2148')
         changes += 1
         print("  ✓ Fixed Moon velocity: 6.396 → 0.2148")
     
-    if 'scenario_validator' not in content:
+    if 'scenario_validator' not in hits:
         pos = content.find('import json')
         if pos != -1:
             nl = content.find('\n', pos) + 1
@@ -54,8 +43,7 @@ def fix_moon_velocity(filepath):
             print("  ✓ Added validator")
     
     if changes:
-        with open(filepath, 'w', encoding='utf-8') as f:
-            f.write(content)
+        write_source(filepath, content)
     return changes > 0
 
 print("=" * 70)
@@ -71,6 +59,7 @@ print(f"\n✓ Found: {ai_file}")
 input("\nPress ENTER to fix...")
 
 backup_file(ai_file)
+print(f"  ✓ Backed up {ai_file}")
 fix_moon_velocity(ai_file)
 
 print("\n" + "=" * 70)
@@ -5,67 +5,15 @@ Windows-compatible version with proper UTF-8 encoding.
 """
 
 import os
+import re
 import sys
-from datetime import datetime
 
-def backup_file(filepath):
-    """Create timestamped backup with UTF-8 encoding."""
-    if os.path.exists(filepath):
-        backup = f"{filepath}.backup.{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-        try:
-            with open(filepath, 'r', encoding='utf-8') as src:
-                with open(backup, 'w', encoding='utf-8') as dst:
-                    dst.write(src.read())
-            print(f"  ✓ Backed up: {backup}")
-            return True
-        except UnicodeDecodeError:
-            # Try with different encoding
-            with open(filepath, 'r', encoding='latin-1') as src:
-                with open(backup, 'w', encoding='utf-8') as dst:
-                    dst.write(src.read())
-            print(f"  ✓ Backed up: {backup} (converted to UTF-8)")
-            return True
-    return False
+from patch_utils import backup_file, read_source, write_source
 
-def fix_html_rendering():
-    """Add z-ordering to body rendering."""
-    filepath = "index_rebound.html"
-    
-    if not os.path.exists(filepath):
-        print(f"  ✗ {filepath} not found")
-        print("     Make sure you're in the correct directory")
-        return False
-    
-    backup_file(filepath)
-    
-    # Read file with UTF-8
-    try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            content = f.read()
-    except UnicodeDecodeError:
-        # Fallback to latin-1
-        with open(filepath, 'r', encoding='latin-1') as f:
-            content = f.read()
-    
-    # Find the renderFrame function and bodies.forEach
-    target = "var bodies = data.bodies || []; simState.currentBodies = bodies;\n      bodies.forEach(function (b) {"
-    
-    if target not in content:
-        # Try without exact spacing
-        target_alt1 = "var bodies = data.bodies || []"
-        target_alt2 = "bodies.forEach(function (b) {"
-        
-        if target_alt1 in content and target_alt2 in content:
-            # Find the section between these two
-            start = content.find(target_alt1)
-            end = content.find(target_alt2, start)
-            
-            if start != -1 and end != -1:
-                # Extract the full section
-                section = content[start:end + len(target_alt2)]
-                
-                # Create replacement
-                replacement = """var bodies = data.bodies || []; simState.currentBodies = bodies;
+# renderFrame: from the bodies assignment up to (and including) its forEach
+RENDER_LOOP = re.compile(r"var bodies = data\.bodies \|\| \[\].*?bodies\.forEach\(function \(b\) \{", re.S)
+
+Z_ORDER_REPLACEMENT = """var bodies = data.bodies || []; simState.currentBodies = bodies;
 
       // Z-ORDER FIX: Render stars first (background), then planets by distance
       var sortedBodies = bodies.slice().sort(function(a, b) {
@@ -79,42 +27,31 @@ def fix_html_rendering():
       });
 
       sortedBodies.forEach(function (b) {"""
-                
-                content = content.replace(section, replacement)
-                
-                # Write back with UTF-8
-                with open(filepath, 'w', encoding='utf-8') as f:
-                    f.write(content)
-                
-                print("  ✓ Added z-ordering to body rendering")
-                print("     Sun will now always render behind planets")
-                return True
-        
-        print("  ✗ Could not find rendering code to patch")
-        print("     Manual fix needed - see instructions below")
+
+def fix_html_rendering():
+    """Add z-ordering to body rendering."""
+    filepath = "index_rebound.html"
+    
+    if not os.path.exists(filepath):
+        print(f"  ✗ {filepath} not found")
+        print("     Make sure you're in the correct directory")
         return False
     
-    # Original exact match found
-    replacement = """var bodies = data.bodies || []; simState.currentBodies = bodies;
-
-      // Z-ORDER FIX: Render stars first (background), then planets by distance
-      var sortedBodies = bodies.slice().sort(function(a, b) {
-        // Stars always in back
-        if (a.type === 'star' && b.type !== 'star') return -1;
-        if (b.type === 'star' && a.type !== 'star') return 1;
-        // Render farther bodies first (they go behind)
-        var distA = a.x * a.x + a.y * a.y;
-        var distB = b.x * b.x + b.y * b.y;
-        return distB - distA;
-      });
-
-      sortedBodies.forEach(function (b) {"""
+    backup = backup_file(filepath)
+    print(f"  ✓ Backed up: {backup}")
+    
+    content = read_source(filepath)
     
-    content = content.replace(target, replacement)
+    # One non-greedy match covers both the exact single-line form and any
+    # spacing between the bodies assignment and its forEach
+    content, n = RENDER_LOOP.subn(lambda m: Z_ORDER_REPLACEMENT, content, count=1)
+    if not n:
+        print("  ✗ Could not find rendering code to patch")
+        print("     Manual fix needed - see instructions below")
+        return False
     
     # Write back with UTF-8
-    with open(filepath, 'w', encoding='utf-8') as f:
-        f.write(content)
+    write_source(filepath, content)
     
     print("  ✓ Added z-ordering to body rendering")
     print("     Sun will now always render behind planets")
@@ -8,8 +8,38 @@ Fix Suggestions:
 """
 
 import os
+import re
 import sys
 
+from patch_utils import backup_file, read_source, write_source
+from text_match import KeywordMatcher
+
+TRAPPIST_SUGGESTION = '<div class="wce" onclick="fillSim(\'TRAPPIST-1 all 7 planets\')">⚡ Simulate TRAPPIST-1</div>'
+
+TRAPPIST_WITH_EXTRAS = '''<div class="wce" onclick="fillSim('TRAPPIST-1 all 7 planets')">⚡ Simulate TRAPPIST-1</div>
+            <div class="wce" onclick="fillSim('Earth Moon system')">⚡ Simulate Earth-Moon</div>
+            <div class="wce" onclick="fillSim('Hot Jupiter with two planets')">⚡ Simulate Hot Jupiter</div>'''
+
+# Both HTML edits in a single scan: a suggestion line mentioning black holes
+# merging (removed with its newline), and the TRAPPIST-1 suggestion (extended)
+HTML_FIXES = re.compile(
+    r"(?P<bh_suggest>^[^\n]*(?:two black holes merging[^\n]*onclick|onclick[^\n]*two black holes merging)[^\n]*(?:\n|$))"
+    r"|(?P<trappist>" + re.escape(TRAPPIST_SUGGESTION) + r")",
+    re.M,
+)
+
+OLD_MESSAGES = re.compile(
+    r"I specialize in orbital mechanics and dynamics only\.|I specialize in orbital mechanics\."
+)
+# "Ask about" marks an already-updated message; one scan tells whether a
+# file needs the rewrite at all
+MESSAGE_SENTINELS = KeywordMatcher([
+    "Ask about",
+    "I specialize in orbital mechanics and dynamics only.",
+    "I specialize in orbital mechanics.",
+])
+NEW_MESSAGE = "I specialize in orbital mechanics. Ask about planet orbits, transfers, Lagrange points, Kepler's laws related to orbital dynamics!"
+
 def fix_html_suggestions():
     """Remove non-orbital suggestions from HTML"""
     
@@ -18,53 +48,32 @@ def fix_html_suggestions():
         print("✗ index_rebound.html not found")
         return False
     
-    try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            content = f.read()
-    except:
-        with open(filepath, 'r', encoding='latin-1') as f:
-            content = f.read()
+    content = read_source(filepath)
     
     changes = []
     
-    # Remove black holes merging suggestion (not orbital dynamics)
-    if "two black holes merging" in content:
-        # Find and remove the entire line
-        lines = content.split('\n')
-        new_lines = []
-        for line in lines:
-            if "two black holes merging" in line and "onclick" in line:
-                # Skip this line (remove it)
-                changes.append("Removed 'black holes merging' suggestion")
-                continue
-            new_lines.append(line)
-        
-        content = '\n'.join(new_lines)
-    
-    # Replace with orbital-friendly suggestions
-    # Find the suggestion area and add better examples
-    if '<div class="wce"' in content and len(changes) > 0:
+    def dispatch(m):
+        if m.lastgroup == "bh_suggest":
+            # Drop the whole line (not orbital dynamics)
+            changes.append("Removed 'black holes merging' suggestion")
+            return ""
         # Add replacement suggestions after TRAPPIST-1
-        old_section = '<div class="wce" onclick="fillSim(\'TRAPPIST-1 all 7 planets\')">⚡ Simulate TRAPPIST-1</div>'
-        
-        new_section = '''<div class="wce" onclick="fillSim('TRAPPIST-1 all 7 planets')">⚡ Simulate TRAPPIST-1</div>
-            <div class="wce" onclick="fillSim('Earth Moon system')">⚡ Simulate Earth-Moon</div>
-            <div class="wce" onclick="fillSim('Hot Jupiter with two planets')">⚡ Simulate Hot Jupiter</div>'''
-        
-        if old_section in content:
-            content = content.replace(old_section, new_section)
-            changes.append("Added Earth-Moon and Hot Jupiter suggestions")
+        changes.append("Added Earth-Moon and Hot Jupiter suggestions")
+        return TRAPPIST_WITH_EXTRAS
+    
+    # One pass over the file for both edits
+    patched = HTML_FIXES.sub(dispatch, content)
+    
+    # The extra suggestions only replace the removed one — if nothing was
+    # removed, leave the file alone
+    if "Removed 'black holes merging' suggestion" not in changes:
+        changes = []
+    else:
+        content = patched
     
     if changes:
-        # Backup
-        backup = filepath + ".backup"
-        if not os.path.exists(backup):
-            with open(backup, 'w', encoding='utf-8') as f:
-                with open(filepath, 'r', encoding='utf-8') as src:
-                    f.write(src.read())
-        
-        with open(filepath, 'w', encoding='utf-8') as f:
-            f.write(content)
+        backup_file(filepath, timestamped=False)
+        write_source(filepath, content)
         
         return changes
     
@@ -78,39 +87,20 @@ def fix_chatbot_message():
         if not os.path.exists(filepath):
             continue
         
-        try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                content = f.read()
-        except:
-            with open(filepath, 'r', encoding='latin-1') as f:
-                content = f.read()
-        
-        changes = []
-        
-        # Find the current message
-        old_messages = [
-            "I specialize in orbital mechanics.",
-            "I specialize in orbital mechanics and dynamics only.",
-        ]
-        
-        new_message = "I specialize in orbital mechanics. Ask about planet orbits, transfers, Lagrange points, Kepler's laws related to orbital dynamics!"
+        content = read_source(filepath)
         
         changed = False
-        for old_msg in old_messages:
-            if old_msg in content and "Ask about" not in content:
-                content = content.replace(old_msg, new_message)
+        changes = []
+        hits = MESSAGE_SENTINELS.findall(content)
+        if hits and "Ask about" not in hits:
+            content, n = OLD_MESSAGES.subn(NEW_MESSAGE, content)
+            if n:
                 changed = True
                 changes.append(f"Updated message in {filepath}")
         
         if changed:
-            # Backup
-            backup = filepath + ".backup"
-            if not os.path.exists(backup):
-                with open(backup, 'w', encoding='utf-8') as f:
-                    f.write(open(filepath, 'r', encoding='utf-8').read())
-            
-            with open(filepath, 'w', encoding='utf-8') as f:
-                f.write(content)
+            backup_file(filepath, timestamped=False)
+            write_source(filepath, content)
             
             return changes
     
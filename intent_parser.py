@@ -1,36 +1,307 @@
-import requests
+"""
+Intent parsing and RAG answers via a local Ollama server.
+
+Start Ollama with:
+    OLLAMA_NUM_PARALLEL=4       the concurrent intent parse + RAG answer of a
+                                chat run in parallel instead of queueing
+    OLLAMA_MAX_LOADED_MODELS=2  room for the scenario generator's model too
+    OLLAMA_KEEP_ALIVE=24h       no multi-second reload after idle periods
+Every request also sends keep_alive; servers call warmup() at startup to load
+the model ahead of the first chat.
+"""
+
+import asyncio
+import atexit
+import hashlib
+import httpx
 import json
+import os
+import re
+import threading
+from collections import OrderedDict
+
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
+try:
+    import numpy as np
+    from chromadb.utils import embedding_functions
+    _cache_embedder = embedding_functions.DefaultEmbeddingFunction()
+    SEMANTIC_CACHE_AVAILABLE = True
+except:
+    SEMANTIC_CACHE_AVAILABLE = False
 
 OLLAMA_URL = "http://localhost:11434/api/generate"
 MODEL = "llama3.1"  
+OLLAMA_KEEP_ALIVE = os.environ.get("OLLAMA_KEEP_ALIVE", "24h")
 
-def ask_ollama(prompt, system=None):
-    """Send a prompt to Ollama and get response"""
+# One pooled keep-alive client for every parse_intent / answer_with_rag call —
+# no TCP connect per request; connection failures are retried before giving up
+_SESSION = httpx.Client(
+    transport=httpx.HTTPTransport(retries=3),
+    timeout=httpx.Timeout(120.0, connect=10.0),
+    limits=httpx.Limits(max_keepalive_connections=8, keepalive_expiry=30.0),
+)
+atexit.register(_SESSION.close)
+
+# Async twin for the servers: the intent parse and the RAG lookup of a chat
+# request run concurrently on the event loop instead of back-to-back
+_ASYNC_SESSION = httpx.AsyncClient(
+    transport=httpx.AsyncHTTPTransport(retries=3),
+    timeout=httpx.Timeout(120.0, connect=10.0),
+    limits=httpx.Limits(max_keepalive_connections=8, keepalive_expiry=30.0),
+)
+
+INTENT_NUM_PREDICT = 128   # the intent schema is ~30-50 tokens
+
+def _ollama_payload(prompt, system=None, stream=False, num_predict=500, format=None):
     full_prompt = f"{system}\n\n{prompt}" if system else prompt
+    payload = {
+        "model": MODEL,
+        "prompt": full_prompt,
+        "stream": stream,
+        "keep_alive": OLLAMA_KEEP_ALIVE,
+        "options": {
+            "temperature": 0.1,  # Low = more consistent output
+            "num_predict": num_predict
+        }
+    }
+    if format:
+        payload["format"] = format   # "json" = grammar-constrained output
+    return payload
+
+def _load_model():
+    try:   # an empty prompt only loads the model
+        _SESSION.post(OLLAMA_URL, json={"model": MODEL, "prompt": "", "keep_alive": OLLAMA_KEEP_ALIVE})
+    except Exception:
+        pass   # Ollama not up yet — the first real request loads the model
+
+def warmup():
+    """Load MODEL ahead of the first chat, in the background so the caller never waits on Ollama"""
+    threading.Thread(target=_load_model, name="ollama-warmup", daemon=True).start()
+
+def ask_ollama(prompt, system=None, format=None):
+    """Send a prompt to Ollama and get response"""
     try:
-        response = requests.post(
-            OLLAMA_URL,
-            json={
-                "model": MODEL,
-                "prompt": full_prompt,
-                "stream": False,
-                "options": {
-                    "temperature": 0.1,  # Low = more consistent output
-                    "num_predict": 500
-                }
-            },
-            timeout=120
-        )
-        return response.json().get("response", "").strip()
+        response = _SESSION.post(OLLAMA_URL, json=_ollama_payload(prompt, system, format=format))
+        return _json_loads(response.content).get("response", "").strip()
     except Exception as e:
         return f"Ollama error: {e}"
 
-def parse_intent(user_input):
+async def ask_ollama_async(prompt, system=None, format=None):
+    """ask_ollama without blocking the event loop.
+    (Run Ollama with OLLAMA_NUM_PARALLEL>=2 so concurrent requests are served in parallel.)"""
+    try:
+        response = await _ASYNC_SESSION.post(OLLAMA_URL, json=_ollama_payload(prompt, system, format=format))
+        return _json_loads(response.content).get("response", "").strip()
+    except Exception as e:
+        return f"Ollama error: {e}"
+
+class _JsonObjectTracker:
+    """Brace depth of streamed text (string-aware); done once the first {...} closes."""
+
+    def __init__(self):
+        self.depth = 0
+        self.started = False
+        self.in_string = False
+        self.escaped = False
+
+    def feed(self, piece):
+        for ch in piece:
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif ch == "\\":
+                    self.escaped = True
+                elif ch == '"':
+                    self.in_string = False
+            elif ch == '"' and self.started:
+                self.in_string = True
+            elif ch == "{":
+                self.depth += 1
+                self.started = True
+            elif ch == "}" and self.started:
+                self.depth -= 1
+                if self.depth == 0:
+                    return True
+        return False
+
+def _stream_piece(line, parts, tracker):
+    """Add one streamed Ollama line to parts; True when generation can stop."""
+    if not line:
+        return False
+    chunk = _json_loads(line)
+    piece = chunk.get("response", "")
+    parts.append(piece)
+    return tracker.feed(piece) or chunk.get("done", False)
+
+def ask_ollama_json(prompt, system=None):
     """
-    Use Ollama to parse user input into structured intent
-    Returns a dict with intent, body, action, duration
+    ask_ollama for replies that are a single JSON object: output is
+    grammar-constrained (format="json"), streamed, and the connection closed
+    as soon as the object's braces balance, so the model doesn't keep
+    generating after the closing }.
     """
-    system = """You are an orbital mechanics assistant parser.
+    parts, tracker = [], _JsonObjectTracker()
+    payload = _ollama_payload(prompt, system, stream=True,
+                              num_predict=INTENT_NUM_PREDICT, format="json")
+    try:
+        with _SESSION.stream("POST", OLLAMA_URL, json=payload) as response:
+            for line in response.iter_lines():
+                if _stream_piece(line, parts, tracker):
+                    break
+        return "".join(parts).strip()
+    except Exception as e:
+        return f"Ollama error: {e}"
+
+async def ask_ollama_json_async(prompt, system=None):
+    """ask_ollama_json without blocking the event loop."""
+    parts, tracker = [], _JsonObjectTracker()
+    payload = _ollama_payload(prompt, system, stream=True,
+                              num_predict=INTENT_NUM_PREDICT, format="json")
+    try:
+        async with _ASYNC_SESSION.stream("POST", OLLAMA_URL, json=payload) as response:
+            async for line in response.aiter_lines():
+                if _stream_piece(line, parts, tracker):
+                    break
+        return "".join(parts).strip()
+    except Exception as e:
+        return f"Ollama error: {e}"
+
+# ── RESPONSE CACHE ───────────────────────────────────────────
+# Repeated chat questions skip the LLM: intents are cached by normalized text
+# (exact) and by MiniLM embedding (paraphrases, only when the numbers match —
+# "2 years" vs "3 years" must not share an intent); RAG answers are cached by
+# question + retrieved context. Intents persist across restarts.
+INTENT_CACHE_PATH = "./intent_cache.json"
+INTENT_CACHE_THRESHOLD = 0.95   # cosine similarity needed for a paraphrase hit
+RESPONSE_CACHE_MAX = 1024
+
+_WHITESPACE = re.compile(r"\s+")
+_NUMBER     = re.compile(r"\d+(?:\.\d+)?")
+
+# The servers look intents up from worker threads (asyncio.to_thread) while
+# the event loop stores new ones: the LRU dicts are guarded by _cache_lock, and
+# the semantic entries are one (vectors, texts, intents) tuple that a store
+# replaces in a single assignment, so a lookup never sees mismatched rows.
+# The JSON file is written on a timer thread, at most once per
+# INTENT_SAVE_DELAY, via a temp file + os.replace.
+INTENT_SAVE_DELAY = 2.0
+
+_intent_exact    = OrderedDict()   # blake2b(normalized text) -> intent
+_intent_semantic = (None, (), ())  # (vectors, texts, intents)
+_answer_cache    = OrderedDict()   # blake2b(question, context) -> answer
+_cache_lock      = threading.Lock()
+_intent_save_lock  = threading.Lock()
+_intent_save_timer = None
+
+def _normalize(text):
+    return _WHITESPACE.sub(" ", text.lower()).strip()
+
+def _cache_key(*parts):
+    return hashlib.blake2b("\x00".join(parts).encode("utf-8"), digest_size=16).hexdigest()
+
+def _lru_get(cache, key):
+    with _cache_lock:
+        value = cache.get(key)
+        if value is not None:
+            cache.move_to_end(key)
+        return value
+
+def _lru_put(cache, key, value):
+    with _cache_lock:
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > RESPONSE_CACHE_MAX:
+            cache.popitem(last=False)
+
+def _embed_text(text):
+    """Unit-length MiniLM embedding of a normalized message."""
+    v = np.asarray(_cache_embedder([text])[0], dtype=np.float32)
+    return v / (np.linalg.norm(v) + 1e-12)
+
+def _load_intent_cache():
+    """Load intents (with their embeddings) saved by earlier runs."""
+    global _intent_semantic
+    if not SEMANTIC_CACHE_AVAILABLE or not os.path.exists(INTENT_CACHE_PATH):
+        return
+    try:
+        with open(INTENT_CACHE_PATH, "r", encoding="utf-8") as f:
+            saved = json.load(f)
+        if saved["intents"]:
+            _intent_semantic = (np.asarray(saved["vectors"], dtype=np.float32),
+                                tuple(saved["texts"]), tuple(saved["intents"]))
+            for text, intent in zip(saved["texts"], saved["intents"]):
+                _lru_put(_intent_exact, _cache_key(text), intent)
+    except Exception as e:
+        print(f"⚠️  Warning: could not load intent cache: {e}")
+
+def _intent_lookup(user_input):
+    """(cached intent or None, normalized text, embedding or None)."""
+    norm = _normalize(user_input)
+    hit = _lru_get(_intent_exact, _cache_key(norm))
+    if hit is not None or not SEMANTIC_CACHE_AVAILABLE:
+        return hit, norm, None
+    q = _embed_text(norm)
+    vectors, texts, intents = _intent_semantic
+    if vectors is not None:
+        scores = vectors @ q
+        best = int(np.argmax(scores))
+        if (scores[best] >= INTENT_CACHE_THRESHOLD
+                and _NUMBER.findall(texts[best]) == _NUMBER.findall(norm)):
+            return intents[best], norm, q
+    return None, norm, q
+
+def _intent_store(norm, q, intent):
+    """Cache a freshly parsed intent and schedule saving the semantic entries."""
+    global _intent_semantic, _intent_save_timer
+    _lru_put(_intent_exact, _cache_key(norm), intent)
+    if q is None:
+        return
+    with _cache_lock:
+        vectors, texts, intents = _intent_semantic
+        vectors = q[None, :] if vectors is None else np.vstack([vectors, q])[-RESPONSE_CACHE_MAX:]
+        _intent_semantic = (vectors, (texts + (norm,))[-RESPONSE_CACHE_MAX:],
+                            (intents + (intent,))[-RESPONSE_CACHE_MAX:])
+        if _intent_save_timer is None:
+            _intent_save_timer = threading.Timer(INTENT_SAVE_DELAY, _save_intent_cache)
+            _intent_save_timer.daemon = True
+            _intent_save_timer.start()
+
+def _save_intent_cache():
+    """Write the current semantic entries to INTENT_CACHE_PATH atomically."""
+    global _intent_save_timer
+    with _cache_lock:
+        _intent_save_timer = None
+        vectors, texts, intents = _intent_semantic
+    if vectors is None:
+        return
+    with _intent_save_lock:
+        tmp_path = INTENT_CACHE_PATH + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"texts":   list(texts),
+                           "vectors": vectors.tolist(),
+                           "intents": list(intents)}, f)
+            os.replace(tmp_path, INTENT_CACHE_PATH)
+        except Exception as e:
+            print(f"⚠️  Warning: could not save intent cache: {e}")
+
+def _flush_intent_cache():
+    """At exit: write a save that is still waiting on its timer."""
+    timer = _intent_save_timer
+    if timer is not None:
+        timer.cancel()
+        _save_intent_cache()
+
+atexit.register(_flush_intent_cache)
+
+_load_intent_cache()
+
+INTENT_SYSTEM_PROMPT = """You are an orbital mechanics assistant parser.
 Convert user input into JSON. Reply with ONLY valid JSON, nothing else.
 
 JSON structure:
@@ -58,24 +329,23 @@ Input: "What is the best pizza topping?"
 Output: {"intent":"unknown","body":null,"action":null,"duration_days":null,"reference":null,"plot_type":null,"is_orbital":false}
 """
 
-    response = ask_ollama(user_input, system=system)
+# First-object JSON decoding of intent replies
+_JSON_DECODER = json.JSONDecoder()
 
-    # Clean response — remove markdown if present
-    response = response.replace("```json", "").replace("```", "").strip()
-
-    # Find JSON in response
-    try:
-        # Try direct parse first
-        return json.loads(response)
-    except:
-        # Try to extract JSON from response
-        start = response.find("{")
-        end = response.rfind("}") + 1
-        if start != -1 and end > start:
-            try:
-                return json.loads(response[start:end])
-            except:
-                pass
+def _parse_intent_response(response):
+    """
+    Parse the intent JSON of an Ollama reply (unknown-intent dict on failure).
+    Intent requests use format="json", so the reply is bare JSON; decoding
+    starts at the first { and stops at the end of that object, in one scan,
+    so trailing text is ignored. Failures are truncated output or an Ollama
+    error string.
+    """
+    start = response.find("{")
+    if start != -1:
+        try:
+            return _JSON_DECODER.raw_decode(response, start)[0]
+        except ValueError:
+            pass
 
     # Fallback if parsing fails
     return {
@@ -88,6 +358,100 @@ Output: {"intent":"unknown","body":null,"action":null,"duration_days":null,"refe
         "is_orbital": False
     }
 
+# ── RULE-BASED FAST PATH ─────────────────────────────────────
+# The common, unambiguous requests ("Simulate Mars orbit for 2 years",
+# "Show Earth to Mars transfer", "What is a Hohmann transfer?") are parsed
+# deterministically; anything these rules don't fully cover goes to the LLM.
+# Only unambiguous verbs count as a simulate request ("model" / "run" also
+# appear in questions like "what model explains Mars's orbit?"). Negations,
+# non-planet bodies (moons, the Sun, comets, ...) and numbers without a
+# recognised duration unit are left to the LLM as well.
+_BODY_RE     = re.compile(r"\b(mercury|venus|earth|mars|jupiter|saturn|uranus|neptune)\b", re.I)
+_DURATION_RE = re.compile(r"(\d+(?:\.\d+)?)\s*(day|week|month|year)s?\b", re.I)
+_SIMULATE_RE = re.compile(r"\b(simulate|animate)\b", re.I)
+_PLOT_RE     = re.compile(r"\b(show|plot|draw|visuali[sz]e)\b", re.I)
+_ORBIT_RE    = re.compile(r"\borbits?\b", re.I)
+_TRANSFER_RE = re.compile(r"\b(transfer|hohmann)\b", re.I)
+_EXPLAIN_RE  = re.compile(r"^\s*(what\s+(is|are)|explain|define|describe)\b", re.I)
+_TOPIC_RE    = re.compile(r"\b(transfer|hohmann|lagrange|resonance|flyby|kepler)", re.I)
+_NEGATION_RE = re.compile(r"\b(not|no|never|without|except|instead)\b|n't\b", re.I)
+_OTHER_BODY_RE = re.compile(
+    r"\b(moons?|sun|stars?|pluto|ceres|eris|comets?|asteroids?|trojans?|satellites?|"
+    r"spacecraft|probes?|io|europa|ganymede|callisto|titan|phobos|deimos|halley)\b", re.I)
+
+_DAYS_PER_UNIT = {"day": 1, "week": 7, "month": 30, "year": 365}
+_TOPIC_ACTION  = {"transfer": "transfer", "hohmann": "transfer", "lagrange": "lagrange",
+                  "resonance": "resonance", "flyby": "flyby", "kepler": "explain"}
+
+def _rule_intent(intent, body=None, action=None, duration=None, reference=None, plot_type=None):
+    return {"intent": intent, "body": body, "action": action, "duration_days": duration,
+            "reference": reference, "plot_type": plot_type, "is_orbital": True}
+
+def _rule_parse(text):
+    """Intent dict for inputs the rules fully understand, else None."""
+    bodies = list(dict.fromkeys(b.lower() for b in _BODY_RE.findall(text)))
+    wants_sim  = _SIMULATE_RE.search(text) is not None
+    wants_plot = _PLOT_RE.search(text) is not None
+    transfer   = _TRANSFER_RE.search(text) is not None
+
+    if _EXPLAIN_RE.search(text) and not bodies:
+        topic = _TOPIC_RE.search(text)
+        if topic:
+            return _rule_intent("explain", action=_TOPIC_ACTION[topic.group(1).lower()])
+        return None
+
+    if _NEGATION_RE.search(text) or _OTHER_BODY_RE.search(text):
+        return None
+    durations = _DURATION_RE.findall(text)
+    if len(durations) > 1 or len(_NUMBER.findall(text)) != len(durations):
+        return None
+
+    if transfer and bodies and (wants_sim or wants_plot) and len(bodies) <= 2 and not durations:
+        origin, target = (bodies[0], bodies[1]) if len(bodies) == 2 else ("earth", bodies[0])
+        return _rule_intent("plot", body=target, action="transfer",
+                            reference=origin, plot_type="trajectory")
+
+    if (wants_sim or wants_plot) and len(bodies) == 1 and not transfer and _ORBIT_RE.search(text):
+        duration = None
+        if durations:
+            value, unit = durations[0]
+            duration = round(float(value) * _DAYS_PER_UNIT[unit.lower()])
+        return _rule_intent("simulate" if wants_sim else "plot", body=bodies[0], action="orbit",
+                            duration=duration, reference="sun", plot_type="orbit")
+    return None
+
+def parse_intent(user_input):
+    """
+    Use Ollama to parse user input into structured intent
+    Returns a dict with intent, body, action, duration
+    """
+    ruled = _rule_parse(user_input)
+    if ruled is not None:
+        return ruled
+    cached, norm, q = _intent_lookup(user_input)
+    if cached is not None:
+        return dict(cached)
+    response = ask_ollama_json(user_input, system=INTENT_SYSTEM_PROMPT)
+    intent = _parse_intent_response(response)
+    if not response.startswith("Ollama error"):
+        _intent_store(norm, q, intent)
+    return dict(intent)
+
+async def parse_intent_async(user_input):
+    """Async parse_intent for the servers."""
+    ruled = _rule_parse(user_input)
+    if ruled is not None:
+        return ruled
+    # Embedding the message for the paraphrase lookup is CPU work — off the loop
+    cached, norm, q = await asyncio.to_thread(_intent_lookup, user_input)
+    if cached is not None:
+        return dict(cached)
+    response = await ask_ollama_json_async(user_input, system=INTENT_SYSTEM_PROMPT)
+    intent = _parse_intent_response(response)
+    if not response.startswith("Ollama error"):
+        _intent_store(norm, q, intent)
+    return dict(intent)
+
 def build_rag_prompt(user_question, rag_context):
     """
     Build the final prompt that combines RAG context + user question
@@ -108,8 +472,26 @@ ANSWER:"""
 
 def answer_with_rag(user_question, rag_context):
     """Full RAG-augmented answer using Ollama"""
+    key = _cache_key(_normalize(user_question), rag_context)
+    cached = _lru_get(_answer_cache, key)
+    if cached is not None:
+        return cached
     prompt = build_rag_prompt(user_question, rag_context)
-    return ask_ollama(prompt)
+    answer = ask_ollama(prompt)
+    if not answer.startswith("Ollama error"):
+        _lru_put(_answer_cache, key, answer)
+    return answer
+
+async def answer_with_rag_async(user_question, rag_context):
+    """Async answer_with_rag for the servers."""
+    key = _cache_key(_normalize(user_question), rag_context)
+    cached = _lru_get(_answer_cache, key)
+    if cached is not None:
+        return cached
+    answer = await ask_ollama_async(build_rag_prompt(user_question, rag_context))
+    if not answer.startswith("Ollama error"):
+        _lru_put(_answer_cache, key, answer)
+    return answer
 
 # ── TEST (only run after Ollama is installed) ─────────────────
 if __name__ == "__main__":
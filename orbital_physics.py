@@ -5,6 +5,12 @@ Ensures correct orbital velocities to prevent bodies from falling or escaping
 
 import math
 
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
 # Physical constants in solar units (AU, yr, Msun)
 G_SOLAR = 4 * math.pi**2  # AU^3 yr^-2 Msun^-1
 
@@ -102,9 +108,46 @@ def escape_velocity(mass_central, radius):
     return math.sqrt(2 * G_SOLAR * mass_central / radius)
 
 
+# Classification order matters: the first matching test wins
+ORBIT_TYPES = [
+    "WILL CRASH (too slow)",
+    "circular",
+    "elliptical",
+    "parabolic (barely bound)",
+    "hyperbolic (unbound)",
+]
+
+
+def _orbit_stability(mass_central, radius, velocity, v_circ):
+    """
+    Classification masks (in ORBIT_TYPES order) and result fields shared by
+    check_orbit_stability and check_orbit_stability_batch. Plain operators
+    only, so it evaluates the same on floats and on NumPy arrays.
+    """
+    v_esc = v_circ * math.sqrt(2)
+    masks = [
+        velocity < v_circ * 0.5,
+        abs(velocity - v_circ) < v_circ * 0.05,
+        velocity < v_esc,
+        abs(velocity - v_esc) < v_esc * 0.01,
+    ]
+    fields = {
+        "velocity": velocity,
+        "v_circular": v_circ,
+        "v_escape": v_esc,
+        "ratio_to_circular": velocity / v_circ,
+        # Specific orbital energy
+        "energy": 0.5 * velocity**2 - G_SOLAR * mass_central / radius,
+        "is_stable": (velocity >= v_circ * 0.5) & (velocity < v_esc * 1.5)
+    }
+    return masks, fields
+
+
 def check_orbit_stability(mass_central, radius, velocity):
     """
     Check if an orbit is stable (circular, elliptical, parabolic, or hyperbolic).
+    Scalars stay in plain floats (a round trip through NumPy costs more
+    than the check itself); arrays go to check_orbit_stability_batch.
     
     Args:
         mass_central: Mass of central body (solar masses)
@@ -114,35 +157,38 @@ def check_orbit_stability(mass_central, radius, velocity):
     Returns:
         dict with orbit type and parameters
     """
-    v_circ = circular_orbit_velocity(mass_central, radius)
-    v_esc = escape_velocity(mass_central, radius)
-    
-    # Specific orbital energy
-    energy = 0.5 * velocity**2 - G_SOLAR * mass_central / radius
-    
-    if velocity < v_circ * 0.5:
-        orbit_type = "WILL CRASH (too slow)"
-    elif abs(velocity - v_circ) < v_circ * 0.05:
-        orbit_type = "circular"
-    elif velocity < v_esc:
-        orbit_type = "elliptical"
-    elif abs(velocity - v_esc) < v_esc * 0.01:
-        orbit_type = "parabolic (barely bound)"
-    else:
-        orbit_type = "hyperbolic (unbound)"
-    
-    return {
-        "type": orbit_type,
-        "velocity": velocity,
-        "v_circular": v_circ,
-        "v_escape": v_esc,
-        "ratio_to_circular": velocity / v_circ,
-        "energy": energy,
-        "is_stable": velocity >= v_circ * 0.5 and velocity < v_esc * 1.5
-    }
+    if not all(isinstance(x, (int, float)) for x in (mass_central, radius, velocity)):
+        return check_orbit_stability_batch(mass_central, radius, velocity)
+    masks, result = _orbit_stability(mass_central, radius, velocity,
+                                     circular_orbit_velocity(mass_central, radius))
+    orbit_type = next((t for t, hit in zip(ORBIT_TYPES, masks) if hit), ORBIT_TYPES[4])
+    return {"type": orbit_type, **result}
+
 
+def check_orbit_stability_batch(mass_central, radius, velocity):
+    """
+    Vectorized check_orbit_stability for many bodies (or trajectory samples)
+    at once — same tests, evaluated as boolean masks and combined with np.select.
+    
+    Args:
+        mass_central: Mass(es) of central body (solar masses), scalar or array
+        radius: Distance(s) from central body (AU), array
+        velocity: Orbital velocity(ies) (AU/yr), array
+    
+    Returns:
+        dict of arrays with the same keys as check_orbit_stability
+    """
+    if not NUMPY_AVAILABLE:
+        raise ImportError("check_orbit_stability_batch requires numpy")
+    mass_central, radius, velocity = np.broadcast_arrays(
+        np.asarray(mass_central, dtype=float),
+        np.asarray(radius, dtype=float),
+        np.asarray(velocity, dtype=float),
+    )
+    masks, result = _orbit_stability(mass_central, radius, velocity,
+                                     np.sqrt(G_SOLAR * mass_central / radius))
+    return {"type": np.select(masks, ORBIT_TYPES[:4], default=ORBIT_TYPES[4]), **result}
 
-# ── COMMON SYSTEMS ────────────────────────────────────────────
 
 def earth_moon_system():
     """
@@ -330,6 +376,24 @@ if __name__ == "__main__":
     print(f"  Period: {em_system['_physics_notes']['orbital_period']}")
     print(f"  ✓ Correct!" if abs(moon['vy'] - v_moon) < 0.001 else "  ERROR!")
     
+    # Test 7: Batch stability check (wrong and correct Moon velocity together)
+    if NUMPY_AVAILABLE:
+        print("\n[Test 7] Batch stability check")
+        batch = check_orbit_stability_batch(M_earth, r_moon, [v_wrong, v_moon])
+        print(f"  Orbit types: {list(batch['type'])}")
+        print(f"  Is stable:   {list(batch['is_stable'])}")
+        
+        # The scalar check must agree with the batch one on every orbit class
+        vs = [v_moon * f for f in (0.3, 0.8, 1.0, 1.2, 1.42, 2.0, 2.5)]
+        batch = check_orbit_stability_batch(M_earth, r_moon, vs)
+        agree = all(
+            check_orbit_stability(M_earth, r_moon, v)["type"] == t
+            and check_orbit_stability(M_earth, r_moon, v)["is_stable"] == bool(stable)
+            for v, t, stable in zip(vs, batch["type"], batch["is_stable"])
+        )
+        print(f"  Scalar/batch agree: {agree}")
+        assert agree, "check_orbit_stability disagrees with check_orbit_stability_batch"
+    
     print("\n" + "=" * 60)
     print("All tests complete!")
     print("=" * 60)
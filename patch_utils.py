@@ -0,0 +1,42 @@
+"""
+Shared file helpers for the one-off patch scripts
+(emergency_fix.py, fix_overlap.py, fix_suggestions.py).
+"""
+
+import os
+import shutil
+from datetime import datetime
+
+
+def read_source(filepath):
+    """Read a file once; decode as UTF-8, falling back to latin-1 for legacy files."""
+    with open(filepath, 'rb') as f:
+        raw = f.read()
+    try:
+        return raw.decode('utf-8')
+    except UnicodeDecodeError:
+        return raw.decode('latin-1')
+
+
+def write_source(filepath, content):
+    with open(filepath, 'w', encoding='utf-8') as f:
+        f.write(content)
+
+
+def backup_file(filepath, timestamped=True):
+    """
+    Byte-for-byte copy of filepath (shutil.copyfile — no decode/re-encode).
+    Timestamped backups are always written; a plain `<file>.backup` is only
+    written once, so the first pristine copy is kept. Returns the backup path,
+    or None if nothing was written.
+    """
+    if not os.path.exists(filepath):
+        return None
+    if timestamped:
+        backup = f"{filepath}.backup.{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    else:
+        backup = filepath + ".backup"
+        if os.path.exists(backup):
+            return None
+    shutil.copyfile(filepath, backup)
+    return backup
@@ -1,5 +1,13 @@
 import numpy as np
 import json
+from functools import lru_cache
+from text_match import KeywordMatcher
+
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
 
 # Real orbital elements for all 8 planets
 SOLAR_SYSTEM = {
@@ -12,33 +20,30 @@ SOLAR_SYSTEM = {
     "uranus":  {"a":19.19,"e":0.0457,"i":0.77, "period":30688.5,"color":"#7de8e8","mass":14.5},
     "neptune": {"a":30.07,"e":0.0113,"i":1.77, "period":60182.0,"color":"#3f54ba","mass":17.1},
 }
+_body_matcher = KeywordMatcher(SOLAR_SYSTEM)
 
-def solve_kepler(M, e, tol=1e-10):
-    """Solve Kepler's equation M = E - e*sin(E) using Newton-Raphson"""
-    E = M.copy()
-    for _ in range(100):
-        dE = (M - E + e * np.sin(E)) / (1 - e * np.cos(E))
-        E += dE
-        if np.max(np.abs(dE)) < tol:
-            break
-    return E
+def find_bodies(text):
+    """Planets named in text (lowercase), in SOLAR_SYSTEM order"""
+    found = _body_matcher.findall(text.lower())
+    return [b for b in SOLAR_SYSTEM if b in found]
 
-def compute_orbit(body_name, duration_days=365, steps=500):
+def solve_kepler(M, e, iterations=5):
     """
-    Compute real Keplerian orbital trajectory
-    Returns x, y coordinates in AU plus orbital data
+    Solve Kepler's equation M = E - e*sin(E) with a fixed number of Halley
+    (3rd-order) steps — no per-iteration convergence reduction. From the
+    starter E0 = M + e*sin(M), 5 steps reach double precision for e < 0.9.
     """
-    body = SOLAR_SYSTEM.get(body_name.lower())
-    if not body:
-        return None
-
-    a = body["a"]
-    e = body["e"]
-    period = body["period"]
-
-    # Time array
-    t = np.linspace(0, duration_days, steps)
+    E = M + e * np.sin(M)
+    for _ in range(iterations):
+        sE, cE = np.sin(E), np.cos(E)
+        f   = E - e * sE - M
+        fp  = 1 - e * cE
+        fpp = e * sE
+        E -= 2 * f * fp / (2 * fp * fp - f * fpp)
+    return E
 
+def _orbit_numpy(t, a, e, period):
+    """Vectorized Keplerian trajectory: (x, y, r, v) at times t (days)"""
     # Mean anomaly
     M = 2 * np.pi * t / period
 
@@ -61,28 +66,146 @@ def compute_orbit(body_name, duration_days=365, steps=500):
     # Orbital speed via vis-viva (AU/day)
     GM = 4 * np.pi**2  # AU^3/yr^2
     v = np.sqrt(GM * (2/r - 1/a)) * (365.25 / (2 * np.pi))
+    # numpy-scalar factors (np.sqrt(1 + e)) can promote; keep t's dtype
+    return tuple(arr.astype(t.dtype, copy=False) for arr in (x, y, r, v))
 
-    return {
-        "body": body_name,
-        "x": x.tolist(),
-        "y": y.tolist(),
-        "r": r.tolist(),
-        "v": v.tolist(),
-        "t": t.tolist(),
+if NUMBA_AVAILABLE:
+    @njit(cache=True, fastmath=True)
+    def _orbit_kernel(t, a, e, period, out_x, out_y, out_r, out_v):
+        """
+        _orbit_numpy fused into one compiled pass over t — no temporaries.
+        Returns (v_min, v_max), tracked inline so callers skip two sweeps of out_v.
+        """
+        GM = 4 * np.pi**2
+        speed_scale = 365.25 / (2 * np.pi)
+        p = a * (1 - e * e)
+        kx = np.sqrt(1 + e)
+        ky = np.sqrt(1 - e)
+        v_min = np.inf
+        v_max = -np.inf
+        for k in range(t.shape[0]):
+            M = 2 * np.pi * t[k] / period
+            E = M + e * np.sin(M)
+            for _ in range(5):                      # Halley, as in solve_kepler
+                sE = np.sin(E)
+                cE = np.cos(E)
+                f = E - e * sE - M
+                fp = 1 - e * cE
+                E -= 2 * f * fp / (2 * fp * fp - f * e * sE)
+            nu = 2 * np.arctan2(kx * np.sin(E / 2), ky * np.cos(E / 2))
+            cn = np.cos(nu)
+            r = p / (1 + e * cn)
+            out_x[k] = r * cn
+            out_y[k] = r * np.sin(nu)
+            out_r[k] = r
+            v = np.sqrt(GM * (2 / r - 1 / a)) * speed_scale
+            out_v[k] = v
+            v_min = min(v_min, v)
+            v_max = max(v_max, v)
+        return v_min, v_max
+
+    @njit(cache=True, parallel=True)
+    def _multi_orbit_kernel(params, t, X, Y, R, V, v_min, v_max):
+        """_orbit_kernel for every (a, e, period) row of params, bodies spread over cores"""
+        for i in prange(params.shape[0]):
+            v_min[i], v_max[i] = _orbit_kernel(t, params[i, 0], params[i, 1], params[i, 2],
+                                               X[i], Y[i], R[i], V[i])
+
+ORBIT_ARRAYS = ("x", "y", "r", "v", "t")
+# Trajectories only feed ~500-point plots: float32 halves memory and payload.
+# (The Numba kernel still does its arithmetic in float64; elements stay float64.)
+ORBIT_DTYPE = np.float32
+
+# Hohmann transfer path: half an ellipse sampled at fixed true anomalies,
+# so the grid and its trig are input-independent and computed once
+_NU = np.linspace(0, np.pi, 300, dtype=ORBIT_DTYPE)
+_COS_NU = np.cos(_NU)
+_SIN_NU = np.sin(_NU)
+
+def _frozen(a):
+    """Mark a memoized result array read-only so callers can't corrupt the cache"""
+    a.flags.writeable = False
+    return a
+
+def compute_orbit(body_name, duration_days=365, steps=500, as_list=False):
+    """
+    Compute real Keplerian orbital trajectory
+    Returns x, y coordinates in AU plus orbital data
+    x/y/r/v/t are read-only float32 ndarrays shared between calls (results
+    are memoized per (body, duration, steps)); pass as_list=True for plain
+    lists, e.g. for a JSON encoder without numpy support.
+    """
+    name = body_name.lower()
+    if name not in SOLAR_SYSTEM:
+        return None
+    return _orbit_result(name, *_compute_orbit_cached(name, duration_days, steps), as_list)
+
+def _orbit_result(name, arrays, v_min, v_max, as_list=False):
+    """Result dict for one body around its shared (x, y, r, v, t) arrays"""
+    body = SOLAR_SYSTEM[name]
+    x, y, r, v, t = arrays
+    a = body["a"]
+    e = body["e"]
+
+    orbit = {
+        "body": name,
+        "x": x,
+        "y": y,
+        "r": r,
+        "v": v,
+        "t": t,
         "color": body["color"],
         "elements": {
             "semi_major_axis_au": a,
             "eccentricity": e,
-            "period_days": round(period, 2),
+            "period_days": round(body["period"], 2),
             "perihelion_au": round(a * (1 - e), 4),
             "aphelion_au": round(a * (1 + e), 4),
-            "max_speed_au_day": round(float(np.max(v)), 6),
-            "min_speed_au_day": round(float(np.min(v)), 6)
+            "max_speed_au_day": round(v_max, 6),
+            "min_speed_au_day": round(v_min, 6)
         }
     }
+    if as_list:
+        orbit.update({k: orbit[k].tolist() for k in ORBIT_ARRAYS})
+    return orbit
 
-def compute_hohmann(body1="earth", body2="mars"):
-    """Compute Hohmann transfer between two planets"""
+@lru_cache(maxsize=256)
+def _compute_orbit_cached(body_name, duration_days, steps):
+    """((x, y, r, v, t), v_min, v_max) for a known lowercase body name — immutable"""
+    body = SOLAR_SYSTEM[body_name]
+    a = body["a"]
+    e = body["e"]
+    period = body["period"]
+
+    # Time array
+    t = np.linspace(0, duration_days, steps, dtype=ORBIT_DTYPE)
+
+    if NUMBA_AVAILABLE:
+        x, y, r, v = (np.empty(steps, dtype=ORBIT_DTYPE) for _ in range(4))
+        v_min, v_max = _orbit_kernel(t, a, e, period, x, y, r, v)
+    else:
+        x, y, r, v = _orbit_numpy(t, a, e, period)
+        v_min, v_max = np.min(v), np.max(v)
+
+    return tuple(_frozen(arr) for arr in (x, y, r, v, t)), float(v_min), float(v_max)
+
+def compute_hohmann(body1="earth", body2="mars", as_list=False):
+    """
+    Compute Hohmann transfer between two planets
+    Memoized per planet pair; transfer_x/transfer_y are read-only float32 ndarrays
+    shared between calls (as_list=True returns plain lists).
+    """
+    transfer = _compute_hohmann_cached(body1, body2)
+    if not transfer:
+        return None
+    transfer = dict(transfer)
+    if as_list:
+        transfer["transfer_x"] = transfer["transfer_x"].tolist()
+        transfer["transfer_y"] = transfer["transfer_y"].tolist()
+    return transfer
+
+@lru_cache(maxsize=128)
+def _compute_hohmann_cached(body1, body2):
     b1 = SOLAR_SYSTEM.get(body1)
     b2 = SOLAR_SYSTEM.get(body2)
     if not b1 or not b2:
@@ -109,10 +232,9 @@ def compute_hohmann(body1="earth", body2="mars"):
 
     # Transfer orbit path
     e_t = (r2 - r1) / (r2 + r1)
-    nu = np.linspace(0, np.pi, 300)
-    r_t = a_t * (1 - e_t**2) / (1 + e_t * np.cos(nu))
-    x_t = (r_t * np.cos(nu)).tolist()
-    y_t = (r_t * np.sin(nu)).tolist()
+    r_t = a_t * (1 - e_t**2) / (1 + e_t * _COS_NU)
+    x_t = _frozen(r_t * _COS_NU)
+    y_t = _frozen(r_t * _SIN_NU)
 
     return {
         "from": body1,
@@ -127,14 +249,30 @@ def compute_hohmann(body1="earth", body2="mars"):
         "transfer_y": y_t
     }
 
-def compute_multi_orbit(bodies, duration_days=365, steps=500):
-    """Compute orbits for multiple bodies at once"""
-    results = []
-    for body in bodies:
-        orbit = compute_orbit(body, duration_days, steps)
-        if orbit:
-            results.append(orbit)
-    return results
+def compute_multi_orbit(bodies, duration_days=365, steps=500, as_list=False):
+    """
+    Compute orbits for multiple bodies at once
+    With Numba all bodies go through one parallel kernel call (memoized per
+    (bodies, duration, steps)); unknown names are skipped.
+    """
+    names = tuple(n for n in (b.lower() for b in bodies) if n in SOLAR_SYSTEM)
+    if not NUMBA_AVAILABLE or len(names) < 2:
+        return [compute_orbit(n, duration_days, steps, as_list=as_list) for n in names]
+    batch = _compute_multi_cached(names, duration_days, steps)
+    return [_orbit_result(n, *orbit, as_list) for n, orbit in zip(names, batch)]
+
+@lru_cache(maxsize=64)
+def _compute_multi_cached(names, duration_days, steps):
+    """((x, y, r, v, t), v_min, v_max) per name; arrays are rows of shared (n_bodies, steps) buffers"""
+    params = np.array([[SOLAR_SYSTEM[n][k] for k in ("a", "e", "period")] for n in names])
+    t = _frozen(np.linspace(0, duration_days, steps, dtype=ORBIT_DTYPE))
+    X, Y, R, V = (np.empty((len(names), steps), dtype=ORBIT_DTYPE) for _ in range(4))
+    v_min, v_max = np.empty(len(names)), np.empty(len(names))
+    _multi_orbit_kernel(params, t, X, Y, R, V, v_min, v_max)
+    for buf in (X, Y, R, V):
+        _frozen(buf)
+    return tuple(((X[i], Y[i], R[i], V[i], t), float(v_min[i]), float(v_max[i]))
+                 for i in range(len(names)))
 
 # ── TEST ──────────────────────────────────────────────────────
 if __name__ == "__main__":
@@ -1,9 +1,38 @@
+import asyncio
 import chromadb
+import threading
+import time
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from chromadb.utils import embedding_functions
+from text_match import KeywordMatcher
 
 # Connect to existing database
 client = chromadb.PersistentClient(path="./chroma_db")
 collection = client.get_collection("orbital_dynamics")
 
+# Same MiniLM model Chroma uses for query_texts — kept resident in process
+_embedder = embedding_functions.DefaultEmbeddingFunction()
+
+# In-memory exact-search index (~1.2K docs): one normalized matrix, searched
+# with a single matrix-vector product instead of Chroma's HNSW + SQLite.
+# Rows are stored as int8 with a per-row scale (4× smaller than float32).
+# At most every INDEX_CHECK_SECONDS a query re-resolves the collection and
+# reloads the index if its id or count changed (rebuilt, swapped or extended).
+# refresh_index rebinds _index to a new dict in one assignment; each search
+# takes one snapshot (_current_index) and scores and looks up documents in it.
+QUANTIZE_INDEX = True
+EMBED_DIM = 384          # all-MiniLM-L6-v2
+INDEX_CHECK_SECONDS = 5.0
+_index = None            # {"matrix", "scales", "documents", "types", "key"}
+_index_checked = 0.0     # time.monotonic() of the last staleness check
+_index_lock = threading.Lock()
+
+# Shared pool for the async entry points: the embedder (ONNX) and the scoring
+# matmul (BLAS) both release the GIL, so concurrent requests search in parallel
+_EXECUTOR = ThreadPoolExecutor(max_workers=8, thread_name_prefix="rag")
+
 ORBITAL_KEYWORDS = [
     "orbit", "orbital", "planet", "star", "comet", "asteroid",
     "kepler", "gravity", "trajectory", "ellipse", "perihelion",
@@ -14,11 +43,110 @@ ORBITAL_KEYWORDS = [
     "solar system", "mars", "earth", "jupiter", "saturn", "venus",
     "mercury", "uranus", "neptune", "simulate", "simulation"
 ]
+_orbital_matcher = KeywordMatcher(ORBITAL_KEYWORDS)
 
 def is_orbital_query(text):
-    """Check if query is related to orbital dynamics"""
-    text = text.lower()
-    return any(kw in text for kw in ORBITAL_KEYWORDS)
+    """Check if query is related to orbital dynamics
+    (one Aho-Corasick / single-regex scan over all ORBITAL_KEYWORDS; plain
+    substring semantics, so "orbits" and "Jupiter's" still match)"""
+    return _orbital_matcher.search(text.lower())
+
+def _collection_key():
+    """(id, count) of the live "orbital_dynamics" collection, re-resolved by
+    name so a rebuilt or swapped-in collection is picked up"""
+    global collection
+    collection = client.get_collection("orbital_dynamics")
+    return (collection.id, collection.count())
+
+def refresh_index():
+    """Load every stored embedding from Chroma into a new in-memory index
+    (swapped in with one assignment, so a search never sees a mix)"""
+    global _index, _index_checked
+    key = _collection_key()
+    data = collection.get(include=["embeddings", "documents", "metadatas"])
+    if len(data["ids"]):
+        matrix = np.asarray(data["embeddings"], dtype=np.float32).reshape(len(data["ids"]), -1)
+    else:
+        # Empty collection: a (0, dim) index, so searches return [] instead of failing
+        matrix = np.empty((0, EMBED_DIM), dtype=np.float32)
+    matrix /= np.linalg.norm(matrix, axis=1, keepdims=True) + 1e-12
+    scales = None
+    if QUANTIZE_INDEX:
+        # Symmetric 8-bit scalar quantization: row ≈ scale * int8_row
+        scales = np.abs(matrix).max(axis=1) / 127.0 + 1e-12
+        matrix = np.round(matrix / scales[:, None]).astype(np.int8)
+        scales = scales.astype(np.float32)
+    _index = {"matrix": matrix, "scales": scales, "documents": data["documents"],
+              "types": np.array([(m or {}).get("type") for m in data["metadatas"]]),
+              "key": key}
+    _index_checked = time.monotonic()
+
+def _index_is_current():
+    """False if the collection changed since the index was loaded (checked at
+    most every INDEX_CHECK_SECONDS; True while it cannot be resolved, e.g.
+    mid-swap, so searches keep using the loaded index)"""
+    global _index_checked
+    if time.monotonic() - _index_checked < INDEX_CHECK_SECONDS:
+        return True
+    _index_checked = time.monotonic()
+    try:
+        return _collection_key() == _index["key"]
+    except Exception:
+        return True
+
+def _current_index():
+    """The index snapshot for one search — loaded on first use, reloaded if stale"""
+    if _index is None or time.monotonic() - _index_checked >= INDEX_CHECK_SECONDS:
+        with _index_lock:                    # concurrent requests load it once
+            if _index is None or not _index_is_current():
+                refresh_index()
+    return _index
+
+def embed_queries(texts):
+    """
+    L2-normalized embeddings for several query texts, from one batched
+    embedder call. Returns a float32 (len(texts), dim) matrix.
+    """
+    q = np.asarray(_embedder(list(texts)), dtype=np.float32)
+    return q / (np.linalg.norm(q, axis=1, keepdims=True) + 1e-12)
+
+@lru_cache(maxsize=256)
+def _query_vector(text):
+    """Normalized embedding of one query — cached, so the several searches a
+    single question fans out to (query_rag_multi) embed it only once."""
+    v = embed_queries([text])[0]
+    v.flags.writeable = False
+    return v
+
+def _scores(idx, user_question):
+    """Cosine score of user_question against every document of index snapshot idx (None if empty)"""
+    matrix, scales = idx["matrix"], idx["scales"]
+    if len(matrix) == 0:
+        return None
+    scores = matrix @ _query_vector(user_question)
+    if scales is not None:
+        scores *= scales
+    return scores
+
+def _top_documents(idx, scores, n_results, doc_type=None):
+    """Best n_results documents of idx by score, optionally restricted to one type"""
+    if doc_type is not None:
+        scores = np.where(idx["types"] == doc_type, scores, -np.inf)
+    k = min(n_results, len(scores))
+    top = np.argpartition(-scores, k - 1)[:k]
+    top = top[np.argsort(-scores[top])]
+    return [idx["documents"][i] for i in top if np.isfinite(scores[i])]
+
+def search(user_question, n_results=3, doc_type=None):
+    """
+    Exact cosine search (inner product over L2-normalized vectors)
+    Returns: list of documents, best match first
+    """
+    idx = _current_index()
+    scores = _scores(idx, user_question)
+    if scores is None:
+        return []
+    return _top_documents(idx, scores, n_results, doc_type)
 
 def query_rag(user_question, n_results=3):
     """
@@ -29,11 +157,7 @@ def query_rag(user_question, n_results=3):
         return None  # Outside our domain
 
     try:
-        results = collection.query(
-            query_texts=[user_question],
-            n_results=n_results
-        )
-        docs = results["documents"][0]
+        docs = search(user_question, n_results=n_results)
         context = "\n\n---\n\n".join(docs)
         return context
 
@@ -47,63 +171,65 @@ def query_rag_by_type(user_question, doc_type, n_results=3):
     doc_type: 'planet', 'concept', 'exoplanet', 'asteroid', 'comet', 'trojan'
     """
     try:
-        results = collection.query(
-            query_texts=[user_question],
-            n_results=n_results,
-            where={"type": doc_type}
-        )
-        docs = results["documents"][0]
+        docs = search(user_question, n_results=n_results, doc_type=doc_type)
         return "\n\n---\n\n".join(docs)
     except Exception as e:
         print(f"RAG filtered query error: {e}")
         return None
 
+_planet_matcher  = KeywordMatcher(["mars", "earth", "jupiter", "saturn", "venus",
+                                   "mercury", "uranus", "neptune"])
+_exo_matcher     = KeywordMatcher(["exoplanet", "hot jupiter", "super earth", "extrasolar"])
+_comet_matcher   = KeywordMatcher(["comet", "halley", "eccentric", "icy"])
+
 def query_rag_multi(user_question):
     """
     Smart query — searches multiple types and combines best results
     Used for complex questions that need both concept + data
+    (one embedding + one scoring pass; each section is a per-type top-k of it)
     """
-    results = []
+    try:
+        idx = _current_index()
+        scores = _scores(idx, user_question)
+    except Exception as e:
+        print(f"RAG query error: {e}")
+        return None
+    if scores is None:
+        return None
 
-    # Always get concept definitions
-    concept = query_rag_by_type(user_question, "concept", n_results=2)
-    if concept:
-        results.append("DEFINITIONS:\n" + concept)
-
-    # Get planet data if planet mentioned
-    planets = ["mars", "earth", "jupiter", "saturn", "venus",
-               "mercury", "uranus", "neptune"]
-    for planet in planets:
-        if planet in user_question.lower():
-            planet_data = query_rag_by_type(
-                user_question, "planet", n_results=1
-            )
-            if planet_data:
-                results.append("PLANET DATA:\n" + planet_data)
-            break
-
-    # Get exoplanet data if relevant
-    if any(w in user_question.lower() for w in
-           ["exoplanet", "hot jupiter", "super earth", "extrasolar"]):
-        exo = query_rag_by_type(user_question, "exoplanet", n_results=2)
-        if exo:
-            results.append("EXOPLANET DATA:\n" + exo)
-
-    # Get comet data if relevant
-    if any(w in user_question.lower() for w in
-           ["comet", "halley", "eccentric", "icy"]):
-        comet = query_rag_by_type(user_question, "comet", n_results=2)
-        if comet:
-            results.append("COMET DATA:\n" + comet)
+    q_lower = user_question.lower()
+    sections = [("DEFINITIONS:\n", "concept", 2)]                  # Always get concept definitions
+    if _planet_matcher.search(q_lower):                              # Planet data if planet mentioned
+        sections.append(("PLANET DATA:\n", "planet", 1))
+    if _exo_matcher.search(q_lower):                                 # Exoplanet data if relevant
+        sections.append(("EXOPLANET DATA:\n", "exoplanet", 2))
+    if _comet_matcher.search(q_lower):                               # Comet data if relevant
+        sections.append(("COMET DATA:\n", "comet", 2))
+
+    results = []
+    for header, doc_type, n in sections:
+        docs = _top_documents(idx, scores, n, doc_type)
+        if docs:
+            results.append(header + "\n\n---\n\n".join(docs))
 
     # Fallback to general search if nothing found
-    if not results:
-        general = query_rag(user_question, n_results=3)
+    if not results and _orbital_matcher.search(q_lower):
+        general = _top_documents(idx, scores, 3)
         if general:
-            results.append(general)
+            results.append("\n\n---\n\n".join(general))
 
     return "\n\n".join(results) if results else None
 
+async def query_rag_async(user_question, n_results=3):
+    """query_rag on the shared RAG thread pool, without blocking the event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_EXECUTOR, query_rag, user_question, n_results)
+
+async def query_rag_multi_async(user_question):
+    """query_rag_multi on the shared RAG thread pool, without blocking the event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_EXECUTOR, query_rag_multi, user_question)
+
 # ── TEST ──────────────────────────────────────────────────────
 if __name__ == "__main__":
     tests = [
@@ -13,6 +13,25 @@ import rebound
 import numpy as np
 import json
 import math
+import os
+import tempfile
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+    prange = range
+
+    def njit(*args, **kwargs):
+        """No-op stand-in: the helpers below are plain Python without Numba."""
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda fn: fn
 
 # ── INTEGRATORS AVAILABLE IN REBOUND ────────────────────────
 # "ias15"    — Default. Adaptive timestep. Near machine precision. Best for most cases.
@@ -30,6 +49,55 @@ INTEGRATOR_GUIDE = {
     "default":           "ias15",      # safest default
 }
 
+def synchronize(sim):
+    """
+    Bring an unsynchronized sim (WHFast/Mercurius with safe_mode=0) to a
+    physical state before reading particles. No-op when already synchronized.
+    (REBOUND 4 renamed integrator_synchronize to synchronize.)
+    """
+    sync = getattr(sim, "synchronize", None) or sim.integrator_synchronize
+    sync()
+
+def integrator_settings(sim, name):
+    """
+    Settings of the sim's current integrator, e.g. for safe_mode / corrector.
+    (REBOUND 5 exposes them on sim.integrator; earlier versions as sim.ri_<name>.)
+    """
+    return getattr(sim, "ri_" + name, None) or sim.integrator
+
+def save_snapshot(sim, path):
+    """Binary snapshot of sim (REBOUND 4 save_to_file / REBOUND 3 save)."""
+    save = getattr(sim, "save_to_file", None) or sim.save
+    save(path)
+
+HORIZONS_WORKERS = 8    # concurrent JPL requests in load_from_horizons
+HORIZONS_RETRIES = 3
+
+def fetch_horizons_particle(name, date, retries=HORIZONS_RETRIES):
+    """
+    One body's state vector from JPL Horizons at `date`, as a Particle in
+    AU / yr / Msun. Fetched into a throwaway sim (REBOUND converts units on
+    add); transient JPL errors are retried with backoff.
+    """
+    for attempt in range(retries):
+        try:
+            sim = rebound.Simulation()
+            sim.units = ('AU', 'yr', 'Msun')
+            sim.add(name, date=date)
+            p = sim.particles[0]
+            # Detached copy: Particle.copy() would keep a pointer to the throwaway sim
+            return rebound.Particle(m=p.m, x=p.x, y=p.y, z=p.z, vx=p.vx, vy=p.vy, vz=p.vz)
+        except Exception:
+            if attempt == retries - 1:
+                raise
+            time.sleep(0.5 * 2 ** attempt)
+
+def _remove_quietly(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
 # ── UNIT SYSTEMS ─────────────────────────────────────────────
 # REBOUND is unit-free — you pick consistent units.
 # Common choices:
@@ -56,24 +124,81 @@ class ReboundEngine:
         self.bodies = []
         self.initial_scenario = None
         self.body_info = []   # colors, radii, types for rendering
+        # body_info as parallel tuples, for direct per-frame indexing
+        self._names  = ()
+        self._colors = ()
+        self._radii  = ()
+        self._types  = ()
+        self._frame_bodies = []   # per-body frame dicts, reused every frame
         self.t_per_frame = 0.01   # simulation time per frame
         self.scale = 1.0      # AU → canvas pixels
         self._E0 = 0.0        # Initial energy
+        self._E0_initial = None   # _E0 of the last load, reused by reset()
+        # sim.energy() is O(N²): the drift display is refreshed every
+        # energy_every frames and reused in between
+        self.energy_every = 30
+        self._frames_since_energy = 0
+        self._last_drift = 0.0
+        # Particle state buffers for REBOUND's serialize_particle_data
+        # (one C call per frame instead of N Python attribute reads)
+        self._xyz    = np.empty((0, 3))
+        self._vxvyvz = np.empty((0, 3))
+        self._m      = np.empty(0)
+        self.frame_format = "bodies"   # or "columns" — see get_frame
+        self._snapshot_path = None     # Horizons initial state, for reset() without re-fetching
+        self._traj_cache = None        # (sim, t, N, duration, n_points) -> sampled trajectories
+
+    def _index_body_info(self):
+        """Materialize body_info as parallel tuples (once per load, not per frame)."""
+        self._names  = tuple(bi.get("name",   f"Body-{i}") for i, bi in enumerate(self.body_info))
+        self._colors = tuple(bi.get("color",  "#ffffff")   for bi in self.body_info)
+        self._radii  = tuple(bi.get("radius", 5)           for bi in self.body_info)
+        self._types  = tuple(bi.get("type",   "planet")    for bi in self.body_info)
+        # Frame dict skeletons: static metadata set once, state fields overwritten per frame
+        self._frame_bodies = [
+            {"name": name, "x": 0.0, "y": 0.0, "vx": 0.0, "vy": 0.0, "speed": 0.0,
+             "mass": 0.0, "color": color, "radius": radius, "type": btype}
+            for name, color, radius, btype in zip(self._names, self._colors, self._radii, self._types)
+        ]
+
+    def _alloc_buffers(self):
+        """Size the particle buffers for the loaded sim (N only shrinks on merges)."""
+        N = self.sim.N
+        self._xyz    = np.empty((N, 3))
+        self._vxvyvz = np.empty((N, 3))
+        self._m      = np.empty(N)
     
     def reset(self):
         """Reset simulation to initial state."""
-        if self.initial_scenario:
-            self.load_scenario(self.initial_scenario)
+        if self.initial_scenario and "use_horizons" in self.initial_scenario:
+            if self._snapshot_path and os.path.exists(self._snapshot_path):
+                # Restore the fetched state from disk — no Horizons round-trips
+                self.sim = rebound.Simulation(self._snapshot_path)
+                self._alloc_buffers()
+                self._bind_step()
+                self._E0 = self._E0_initial
+                self._last_drift = 0.0
+                self._frames_since_energy = 0
+                self._prev_N = self.sim.N
+            else:
+                t_per_frame, scale = self.t_per_frame, self.scale
+                self.load_from_horizons(self.initial_scenario["use_horizons"],
+                                        self.initial_scenario.get("integrator", "whfast"))
+                self.t_per_frame, self.scale = t_per_frame, scale
+        elif self.initial_scenario:
+            self.load_scenario(self.initial_scenario, E0=self._E0_initial)
         else:
             # Clear everything if no initial scenario
             self.sim = None
+            self.__dict__.pop("step", None)   # back to the unloaded ReboundEngine.step
             self.bodies = []
             self.body_info = []
             self._E0 = 0.0
+            self._E0_initial = None
 
     # ── LOAD SCENARIO ────────────────────────────────────────
 
-    def load_scenario(self, scenario: dict) -> dict:
+    def load_scenario(self, scenario: dict, E0: float = None) -> dict:
         """
         Load a scenario from a dict. Scenario format:
         {
@@ -83,6 +208,7 @@ class ReboundEngine:
           "integrator": "whfast",
           "t_per_frame": 0.01,       # simulation time per rendered frame
           "scale": 200,              # AU to canvas pixels (for solar system)
+          "energy_every": 30,        # frames between energy-drift updates (optional)
           "bodies": [
             {
               "name": "Sun",
@@ -91,11 +217,14 @@ class ReboundEngine:
               "vx": 0.0, "vy": 0.0, # AU/yr
               "color": "#fff200",
               "radius": 20,          # pixels for display
+              "r": 0.0047,           # physical radius in sim units (optional; enables collisions)
               "type": "star"
             },
             ...
           ]
         }
+        E0: initial energy, if already known for this exact scenario
+        (reset() passes the one from the first load to skip the O(N²) sum).
         Returns: metadata dict with initial state
         """
         self.sim = rebound.Simulation()
@@ -107,14 +236,40 @@ class ReboundEngine:
         integrator = scenario.get("integrator", "ias15")
         self.sim.integrator = integrator
 
+        # Symplectic runs: skip the per-step synchronize (safe_mode=0), the big
+        # WHFast/Mercurius win. Frames then synchronize before reading state.
+        # A scenario can opt back in with "safe_mode": 1. keep_unsynchronized
+        # lets a frame's synchronize leave the state the corrector and step
+        # loop continue from intact.
+        safe_mode = scenario.get("safe_mode", 0)
+        if integrator == "whfast":
+            whfast = integrator_settings(self.sim, "whfast")
+            whfast.safe_mode = safe_mode
+            whfast.corrector = 11
+            whfast.keep_unsynchronized = 1
+        elif integrator == "mercurius":
+            integrator_settings(self.sim, "mercurius").safe_mode = safe_mode
+
         # Softening for close encounters (optional)
         softening = scenario.get("softening", 0.0)
         if softening > 0:
             self.sim.softening = softening
 
-        # Collision detection — merge bodies on contact
-        if scenario.get("collisions", True):
-            self.sim.collision         = "direct"
+        # Direct-summation gravity (fastest at these N) and an open box.
+        # Mercurius installs its own gravity routine, so it is left alone.
+        if integrator != "mercurius":
+            self.sim.gravity = "basic"
+        self.sim.boundary = "none"
+
+        # Collision detection — merge bodies on contact. Contact needs a
+        # physical radius ("r", sim units; "radius" is display pixels): with
+        # every r == 0 nothing can ever touch, so skip the O(N²) pair search.
+        collision = scenario.get("collision")
+        if collision is None:
+            has_radii = any(b.get("r", 0.0) > 0 for b in scenario["bodies"])
+            collision = "direct" if scenario.get("collisions", True) and has_radii else "none"
+        self.sim.collision = collision
+        if collision != "none":
             self.sim.collision_resolve = "merge"
 
         # Timestep (only for fixed-step integrators)
@@ -123,6 +278,7 @@ class ReboundEngine:
 
         self.t_per_frame = scenario.get("t_per_frame", 0.01)
         self.scale       = scenario.get("scale", 200.0)
+        self.energy_every = max(1, int(scenario.get("energy_every", 30)))
         self.meta        = {
             "name":        scenario.get("name", "Simulation"),
             "description": scenario.get("description", ""),
@@ -142,6 +298,7 @@ class ReboundEngine:
                 vx  = b.get("vx", 0.0),
                 vy  = b.get("vy", 0.0),
                 vz  = 0.0,
+                r   = b.get("r", 0.0),
             )
             self.body_info.append({
                 "name":   b.get("name", f"Body-{len(self.body_info)}"),
@@ -151,14 +308,20 @@ class ReboundEngine:
             })
 
         self.sim.move_to_com()
+        self._index_body_info()
+        self._alloc_buffers()
 
         # Record initial energy for conservation monitoring
-        self._E0 = self.sim.energy()
+        self._E0 = self.sim.energy() if E0 is None else E0
+        self._E0_initial = self._E0
+        self._last_drift = 0.0
+        self._frames_since_energy = 0
         self._prev_N = self.sim.N  # track body count for collision detection
         
         # Store scenario for reset functionality
         self.initial_scenario = scenario
 
+        self._bind_step()
         return self.get_frame()
 
     def load_from_horizons(self, body_names: list, integrator="whfast") -> dict:
@@ -173,6 +336,15 @@ class ReboundEngine:
         self.sim.integrator = integrator
         if integrator == "whfast":
             self.sim.dt = 0.001  # 1/1000 yr ≈ 0.365 days
+            # Same symplectic setup as load_scenario: 11th-order symplectic
+            # corrector for long-run energy conservation, no per-step
+            # synchronize (get_frame synchronizes), and synchronizing for a
+            # frame must not discard the unsynchronized state the corrector
+            # and step loop continue from.
+            whfast = integrator_settings(self.sim, "whfast")
+            whfast.corrector = 11
+            whfast.safe_mode = 0
+            whfast.keep_unsynchronized = 1
 
         # Color/size lookup for known bodies
         BODY_STYLES = {
@@ -188,14 +360,31 @@ class ReboundEngine:
             "Pluto":   {"color": "#c9a87c", "radius": 3,  "type": "planet"},
         }
 
+        # One HTTP round-trip per body, all in flight at once; one shared epoch
+        # so every state vector is for the same instant
+        date = datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0)
+        with ThreadPoolExecutor(max_workers=min(HORIZONS_WORKERS, max(1, len(body_names)))) as pool:
+            particles = list(pool.map(lambda name: fetch_horizons_particle(name, date), body_names))
+
         self.body_info = []
-        for name in body_names:
-            self.sim.add(name)   # REBOUND fetches from Horizons automatically!
+        for name, particle in zip(body_names, particles):
+            self.sim.add(particle)   # added in request order
             style = BODY_STYLES.get(name, {"color": "#aaaaaa", "radius": 5, "type": "planet"})
             self.body_info.append({"name": name, **style})
 
         self.sim.move_to_com()
-        self._E0 = self.sim.energy()
+
+        # Snapshot the fetched state so reset() doesn't hit JPL again
+        if self._snapshot_path is None:
+            self._snapshot_path = os.path.join(tempfile.gettempdir(), f"astro_{os.getpid()}_{id(self)}.bin")
+            weakref.finalize(self, _remove_quietly, self._snapshot_path)
+        save_snapshot(self.sim, self._snapshot_path)
+
+        self._index_body_info()
+        self._alloc_buffers()
+        self._E0 = self._E0_initial = self.sim.energy()
+        self._last_drift = 0.0
+        self._frames_since_energy = 0
         self._prev_N = self.sim.N  # track body count for collision detection
         self.t_per_frame = 0.005
         self.scale = 200.0
@@ -207,12 +396,13 @@ class ReboundEngine:
             "N": len(body_names),
         }
         
-        # Store for reset (simplified - won't re-fetch from Horizons)
+        # Store for reset (restored from the binary snapshot above)
         self.initial_scenario = {
             "use_horizons": body_names,
             "integrator": integrator
         }
         
+        self._bind_step()
         return self.get_frame()
 
     # ── STEP & GET FRAME ─────────────────────────────────────
@@ -223,13 +413,57 @@ class ReboundEngine:
             raise RuntimeError("No simulation loaded. Call load_scenario() or load_from_horizons() first.")
         
         self.sim.integrate(self.sim.t + self.t_per_frame * n_frames)
+        self._frames_since_energy += n_frames
         return self.get_frame()
 
+    def _bind_step(self):
+        """
+        Specialize step() for the loaded sim's integrator (fixed at load):
+        the instance attribute shadows the generic method, with the sim and
+        its bound methods captured once.
+          - fixed-step (whfast / leapfrog / saba): sim.steps(k) — whole
+            timesteps, no shortened final step to land on an exact time
+            (which breaks symplecticity); fractional steps carry over
+          - adaptive (ias15, ...): sim.integrate(t + t_per_frame * n)
+        t_per_frame is still read per call, so speed changes apply immediately.
+        """
+        sim = self.sim
+        get_frame = self.get_frame
+        if sim.integrator in ("whfast", "leapfrog", "saba") and hasattr(sim, "steps"):
+            steps, dt = sim.steps, sim.dt
+            carry = 0.0
+
+            def step(n_frames=1):
+                nonlocal carry
+                want = self.t_per_frame * n_frames / dt + carry
+                k = int(want)
+                carry = want - k
+                if k:
+                    steps(k)
+                self._frames_since_energy += n_frames
+                return get_frame()
+        else:
+            integrate = sim.integrate
+
+            def step(n_frames=1):
+                integrate(sim.t + self.t_per_frame * n_frames)
+                self._frames_since_energy += n_frames
+                return get_frame()
+
+        step.__doc__ = ReboundEngine.step.__doc__
+        self.step = step
+
     def get_frame(self) -> dict:
         """
         Returns current state as a dict ready for JSON serialization.
         Positions are in simulation units (AU for solar system).
         Frontend scales them to canvas pixels using self.scale.
+
+        frame_format "bodies" (default): "bodies" is a list of per-body dicts,
+        reused and overwritten by the next frame (copy them to keep a frame).
+        frame_format "columns": parallel x/y/vx/vy/speed/mass ndarrays plus
+        names/colors/radii/types — no per-body dicts, about half the bytes on
+        the wire (serialize with orjson OPT_SERIALIZE_NUMPY).
         """
         if self.sim is None:
             return {
@@ -239,38 +473,70 @@ class ReboundEngine:
                 "energy_drift": 0.0,
             }
         
-        bodies = []
-        for i, p in enumerate(self.sim.particles):
-            info = self.body_info[i] if i < len(self.body_info) else {}
-            speed = math.sqrt(p.vx**2 + p.vy**2)
-            bodies.append({
-                "name":   info.get("name",   f"Body-{i}"),
-                "x":      round(p.x,  6),
-                "y":      round(p.y,  6),
-                "vx":     round(p.vx, 6),
-                "vy":     round(p.vy, 6),
-                "speed":  round(speed, 6),
-                "mass":   round(p.m, 9),
-                "color":  info.get("color",  "#ffffff"),
-                "radius": info.get("radius", 5),
-                "type":   info.get("type",   "planet"),
-            })
-
-        # Energy conservation check
-        E_now = self.sim.energy()
-        drift = abs((E_now - self._E0) / self._E0) if self._E0 != 0 else 0.0
+        # All particle state in one C call, into the preallocated SoA buffers
+        synchronize(self.sim)
+        N = self.sim.N
+        self.sim.serialize_particle_data(xyz=self._xyz, vxvyvz=self._vxvyvz, m=self._m)
+        x,  y  = self._xyz[:N, 0],    self._xyz[:N, 1]
+        vx, vy = self._vxvyvz[:N, 0], self._vxvyvz[:N, 1]
+        m      = self._m[:N]
+        speed  = np.hypot(vx, vy)
+        np.round(speed, 6, out=speed)
+
+        if self.frame_format == "columns":
+            # Fresh rounded arrays (not views of the buffers, which the next frame overwrites)
+            cols = {"x": np.round(x, 6), "y": np.round(y, 6),
+                    "vx": np.round(vx, 6), "vy": np.round(vy, 6),
+                    "speed": speed, "mass": np.round(m, 9)}
+        else:
+            # Body dicts copy the values out, so round the buffer views in place
+            for arr in (x, y, vx, vy):
+                np.round(arr, 6, out=arr)
+            np.round(m, 9, out=m)
+            cols = {"x": x, "y": y, "vx": vx, "vy": vy, "speed": speed, "mass": m}
+
+        # Energy conservation check — sampled, see energy_every
+        if self._frames_since_energy >= self.energy_every:
+            E_now = self.sim.energy()
+            self._last_drift = abs((E_now - self._E0) / self._E0) if self._E0 != 0 else 0.0
+            self._frames_since_energy = 0
+        drift = self._last_drift
 
         # Collision detection — did a body disappear since last frame?
         collision_occurred = self.sim.N < self._prev_N
         self._prev_N = self.sim.N
 
-        return {
+        frame = {
             "t":                 round(self.sim.t, 6),
             "N":                 self.sim.N,
-            "bodies":            bodies,
             "energy_drift":      round(drift, 12),
             "collision":         collision_occurred,
         }
+        if self.frame_format == "columns":
+            # N never exceeds the bodies loaded, so the metadata tuples cover every index
+            frame.update(cols, format="columns",
+                         names=self._names[:N], colors=self._colors[:N],
+                         radii=self._radii[:N], types=self._types[:N])
+        else:
+            frame["bodies"] = self._fill_frame_bodies(cols)
+        return frame
+
+    def _fill_frame_bodies(self, cols):
+        """
+        Per-body dicts (the "bodies" frame format) from the rounded columns.
+        The dicts are the reused skeletons, updated in place — they are only
+        valid until the next frame; copy them to keep a frame.
+        """
+        columns = zip(self._frame_bodies,
+                      *(cols[k].tolist() for k in ("x", "y", "vx", "vy", "speed", "mass")))
+        for d, bx, by, bvx, bvy, bspeed, bm in columns:
+            d["x"]     = bx
+            d["y"]     = by
+            d["vx"]    = bvx
+            d["vy"]    = bvy
+            d["speed"] = bspeed
+            d["mass"]  = bm
+        return self._frame_bodies[:len(cols["x"])]
 
     def get_orbital_elements(self) -> list:
         """
@@ -280,54 +546,207 @@ class ReboundEngine:
         if self.sim is None or self.sim.N < 2:
             return []
         
-        elements = []
+        synchronize(self.sim)
         primary = self.sim.particles[0]
-        
-        for i in range(1, self.sim.N):
-            p = self.sim.particles[i]
-            try:
-                orb = p.orbit(primary=primary)
-                elements.append({
-                    "name":      self.body_info[i]["name"] if i < len(self.body_info) else f"Body-{i}",
-                    "a":         round(orb.a, 6),       # semi-major axis
-                    "e":         round(orb.e, 6),       # eccentricity
-                    "inc":       round(orb.inc * 180/math.pi, 3),  # inclination (degrees)
-                    "Omega":     round(orb.Omega * 180/math.pi, 3), # longitude of ascending node
-                    "omega":     round(orb.omega * 180/math.pi, 3), # argument of periapsis
-                    "f":         round(orb.f * 180/math.pi, 3),     # true anomaly
-                    "P":         round(orb.P, 6),       # orbital period
-                    "n":         round(orb.n, 6),       # mean motion
-                })
-            except Exception as e:
-                # Some bodies might not have well-defined orbits (e.g., unbound)
-                elements.append({
-                    "name": self.body_info[i]["name"] if i < len(self.body_info) else f"Body-{i}",
-                    "error": str(e)
-                })
+        try:
+            orbits = self.sim.orbits(primary=primary)
+        except Exception:
+            # Some bodies might not have well-defined orbits — per body, keeping the error
+            orbits = []
+            for p in self.sim.particles[1:self.sim.N]:
+                try:
+                    orbits.append(p.orbit(primary=primary))
+                except Exception as e:
+                    orbits.append(e)
+
+        # Element columns for the well-defined orbits, converted/rounded in bulk
+        ok = [o for o in orbits if not isinstance(o, Exception)]
+        def column(attr):
+            return np.fromiter((getattr(o, attr) for o in ok), dtype=np.float64, count=len(ok))
+        cols = {k: np.round(column(k), 6) for k in ("a", "e", "P", "n")}      # AU, -, time, rad/time
+        angles = np.round(np.rad2deg([column(k) for k in ("inc", "Omega", "omega", "f")]), 3)
+        cols.update(zip(("inc", "Omega", "omega", "f"), angles))              # degrees
+        rows = iter(zip(*(cols[k].tolist()
+                          for k in ("a", "e", "inc", "Omega", "omega", "f", "P", "n"))))
+
+        elements = []
+        for i, orb in enumerate(orbits, start=1):
+            name = self._names[i] if i < len(self._names) else f"Body-{i}"
+            if isinstance(orb, Exception):
+                elements.append({"name": name, "error": str(orb)})
+                continue
+            a, e, inc, Omega, omega, f, P, n = next(rows)
+            elements.append({
+                "name":      name,
+                "a":         a,       # semi-major axis
+                "e":         e,       # eccentricity
+                "inc":       inc,     # inclination (degrees)
+                "Omega":     Omega,   # longitude of ascending node
+                "omega":     omega,   # argument of periapsis
+                "f":         f,       # true anomaly
+                "P":         P,       # orbital period
+                "n":         n,       # mean motion
+            })
         
         return elements
 
-    def get_trajectories(self, duration, n_points=200):
+    def get_trajectories(self, duration, n_points=200, as_array=False):
         """
         Compute future trajectories for all bodies without modifying current simulation.
-        Returns list of trajectory arrays (one per body).
+        Returns list of trajectory arrays (one per body) of [x, y] points.
+        as_array=True returns the (N, n_points, 2) ndarray instead (NaN once a
+        body has merged away).
+        Results are cached until the simulation moves on, so repeated previews
+        of a paused sim don't copy and re-integrate it (treat them as read-only).
         """
         if self.sim is None:
             return []
         
+        key = (self.sim.t, self.sim.N, duration, n_points)
+        if self._traj_cache is not None and self._traj_cache[0] is self.sim and self._traj_cache[1] == key:
+            per_body, alive = self._traj_cache[2]
+        else:
+            per_body, alive = self._sample_trajectories(duration, n_points)
+            # Holding the sim itself (not its id) keeps a reloaded sim from matching
+            self._traj_cache = (self.sim, key, (per_body, alive))
+        if as_array:
+            return per_body
+        return [per_body[i, alive > i].tolist() for i in range(per_body.shape[0])]
+
+    def _sample_trajectories(self, duration, n_points):
+        """(per-body (N, n_points, 2) positions, bodies alive per sample) on a copy of the sim."""
         # Save current state
         sim_copy = self.sim.copy()
         
         dt = duration / n_points
-        trajectories = [[] for _ in range(self.sim.N)]
+        N = sim_copy.N
+        traj  = np.empty((n_points, N, 2))
+        alive = np.empty(n_points, dtype=np.int64)   # bodies left at each sample
+        xyz   = np.empty((N, 3))
         
         t_copy = sim_copy.t
         for step in range(n_points):
             sim_copy.integrate(t_copy + step * dt)
-            for i, p in enumerate(sim_copy.particles):
-                trajectories[i].append((round(p.x, 4), round(p.y, 4)))
+            synchronize(sim_copy)
+            sim_copy.serialize_particle_data(xyz=xyz)
+            n = sim_copy.N
+            traj[step, :n] = xyz[:n, :2]
+            traj[step, n:] = np.nan
+            alive[step] = n
         
-        return trajectories
+        np.round(traj, 4, out=traj)
+        per_body = traj.transpose(1, 0, 2)
+        per_body.flags.writeable = False   # shared through the cache
+        return per_body, alive
+
+
+class ReboundEnginePool:
+    """
+    Several independent simulations stepped concurrently (e.g. a "compare
+    scenarios" view). REBOUND's integrate runs in C via ctypes, which drops
+    the GIL, so plain threads step the engines in parallel.
+
+    Usage:
+        with ReboundEnginePool() as pool:
+            pool.load_all([hohmann_scenario, figure8_scenario, binary_scenario])
+            frames = pool.step_all(10)     # one frame per engine, in order
+    """
+
+    def __init__(self, engines=None, max_workers=None):
+        self.engines = list(engines or [])
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    def load_all(self, scenarios):
+        """Add one engine per scenario dict (loaded concurrently); returns their first frames."""
+        engines = [ReboundEngine() for _ in scenarios]
+        frames = list(self._executor.map(lambda pair: pair[0].load_scenario(pair[1]),
+                                         zip(engines, scenarios)))
+        self.engines.extend(engines)
+        return frames
+
+    def step_all(self, n_frames=1):
+        """Advance every engine by n_frames concurrently; returns their frames in order."""
+        return list(self._executor.map(lambda eng: eng.step(n_frames), self.engines))
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# ── ANALYTIC INITIAL CONDITIONS ──────────────────────────────
+# Compiled (and disk-cached) so sweeps over many candidate scenarios pay
+# no interpreter overhead for the vis-viva arithmetic.
+# The compile cache lives in __pycache__ next to this file; for read-only or
+# containerised deploys point NUMBA_CACHE_DIR at a writable, persistent path
+# (e.g. a volume) so only the very first start pays for compilation.
+
+@njit(cache=True, fastmath=True)
+def _hohmann_ic(r1, r2, G):
+    """(v1_circ, v2_circ, v_t1, v_t2, dv1, dv2, T_transfer) for a Hohmann transfer r1 → r2"""
+    # Circular orbital velocities
+    v1_circ = math.sqrt(G / r1)
+    v2_circ = math.sqrt(G / r2)
+
+    # Transfer orbit semi-major axis
+    a_t = (r1 + r2) / 2.0
+
+    # Velocities on transfer ellipse
+    v_t1 = math.sqrt(G * (2/r1 - 1/a_t))
+    v_t2 = math.sqrt(G * (2/r2 - 1/a_t))
+
+    dv1 = v_t1 - v1_circ
+    dv2 = v2_circ - v_t2
+
+    # Transfer time
+    T_transfer = math.pi * math.sqrt(a_t**3 / G)
+    return v1_circ, v2_circ, v_t1, v_t2, dv1, dv2, T_transfer
+
+@njit(cache=True, fastmath=True)
+def _binary_ic(mass1, mass2, separation, eccentricity, G):
+    """(v1, v2) star velocities for a binary started at periastron (vis-viva)"""
+    mu = G * (mass1 + mass2)
+    r  = separation * (1 - eccentricity) if eccentricity > 0 else separation
+    v_total = math.sqrt(mu * (2/r - 1/separation))
+    v1 =  v_total * mass2 / (mass1 + mass2)
+    v2 = -v_total * mass1 / (mass1 + mass2)
+    return v1, v2
+
+@njit(cache=True, fastmath=True, parallel=True)
+def sweep_hohmann(a_arr, G):
+    """
+    Δv₁, Δv₂ and transfer time for every (from, to) pair of orbit radii a_arr,
+    as three (N, N) arrays — rows are departures, columns arrivals.
+    """
+    N = a_arr.size
+    dv1 = np.empty((N, N))
+    dv2 = np.empty((N, N))
+    T   = np.empty((N, N))
+    for i in prange(N):
+        for j in range(N):
+            ic = _hohmann_ic(a_arr[i], a_arr[j], G)
+            dv1[i, j] = ic[4]
+            dv2[i, j] = ic[5]
+            T[i, j]   = ic[6]
+    return dv1, dv2, T
+
+
+def warmup():
+    """
+    Compile (or load from the on-disk cache) every helper above with tiny
+    args, so the first scenario isn't the one that pays for it.
+    """
+    if not NUMBA_AVAILABLE:
+        return
+    _hohmann_ic(1.0, 1.5, 4 * math.pi**2)
+    _binary_ic(1.0, 1.0, 1.0, 0.0, 4 * math.pi**2)
+    sweep_hohmann(np.array([1.0, 1.5]), 4 * math.pi**2)
+
+warmup()
 
 
 # ── SCENARIO TEMPLATES ───────────────────────────────────────
@@ -377,17 +796,9 @@ def three_body_figure8():
 
 def binary_star_system(mass1=1.0, mass2=1.0, separation=2.0, eccentricity=0.0):
     """Configurable binary star system."""
-    # Compute velocities for circular/elliptical orbit
+    # Compute velocities for circular/elliptical orbit (vis-viva)
     G = 4 * math.pi**2  # AU/yr/Msun
-    mu = G * (mass1 + mass2)
-    a  = separation / 2.0
-    
-    # Vis-viva for elliptical orbit
-    r  = separation * (1 - eccentricity) if eccentricity > 0 else separation
-    v_total = math.sqrt(mu * (2/r - 1/separation))
-    
-    v1 =  v_total * mass2 / (mass1 + mass2)
-    v2 = -v_total * mass1 / (mass1 + mass2)
+    v1, v2 = _binary_ic(mass1, mass2, separation, eccentricity, G)
     
     engine = ReboundEngine()
     engine.load_scenario({
@@ -408,38 +819,25 @@ def binary_star_system(mass1=1.0, mass2=1.0, separation=2.0, eccentricity=0.0):
     })
     return engine
 
-def hohmann_transfer(from_body="Earth", to_body="Mars"):
-    """Earth-to-Mars (or any two planets) Hohmann transfer with spacecraft."""
-    PLANETS = {
-        "Mercury": {"a": 0.387, "color": "#b5b5b5"},
-        "Venus":   {"a": 0.723, "color": "#e8cda0"},
-        "Earth":   {"a": 1.000, "color": "#4fffb0"},
-        "Mars":    {"a": 1.524, "color": "#ff6b35"},
-        "Jupiter": {"a": 5.203, "color": "#c88b3a"},
-        "Saturn":  {"a": 9.537, "color": "#e4d191"},
-    }
-    p1 = PLANETS[from_body]
-    p2 = PLANETS[to_body]
-    r1, r2 = p1["a"], p2["a"]
-
-    G_sun = 4 * math.pi**2  # AU^3 yr^-2 Msun^-1
-
-    # Circular orbital velocities
-    v1_circ = math.sqrt(G_sun / r1)
-    v2_circ = math.sqrt(G_sun / r2)
+# Planets available to hohmann_transfer / hohmann_grid, as parallel columns:
+# sweeps hand _PLANET_A straight to sweep_hohmann, single lookups index by name
+_PLANET_NAMES = ("Mercury", "Venus", "Earth", "Mars", "Jupiter", "Saturn")
+_PLANET_A = np.array([0.387, 0.723, 1.000, 1.524, 5.203, 9.537])   # AU
+_PLANET_COLOR = ("#b5b5b5", "#e8cda0", "#4fffb0", "#ff6b35", "#c88b3a", "#e4d191")
 
-    # Transfer orbit semi-major axis
-    a_t = (r1 + r2) / 2.0
-
-    # Velocities on transfer ellipse
-    v_t1 = math.sqrt(G_sun * (2/r1 - 1/a_t))
-    v_t2 = math.sqrt(G_sun * (2/r2 - 1/a_t))
+def hohmann_transfer(from_body="Earth", to_body="Mars", verbose=False):
+    """
+    Earth-to-Mars (or any two planets) Hohmann transfer with spacecraft.
+    verbose=True prints the Δv / transfer-time summary.
+    """
+    i = _PLANET_NAMES.index(from_body)
+    j = _PLANET_NAMES.index(to_body)
+    r1, r2 = float(_PLANET_A[i]), float(_PLANET_A[j])
 
-    dv1 = v_t1 - v1_circ
-    dv2 = v2_circ - v_t2
+    G_sun = 4 * math.pi**2  # AU^3 yr^-2 Msun^-1
 
-    # Transfer time
-    T_transfer = math.pi * math.sqrt(a_t**3 / G_sun)
+    # Circular, transfer-ellipse and Δv velocities plus transfer time
+    v1_circ, v2_circ, v_t1, v_t2, dv1, dv2, T_transfer = _hohmann_ic(r1, r2, G_sun)
 
     engine = ReboundEngine()
     engine.load_scenario({
@@ -457,11 +855,11 @@ def hohmann_transfer(from_body="Earth", to_body="Mars"):
             # Departure planet
             {"name": from_body, "mass": 3e-6,
              "x": r1, "y": 0, "vx": 0, "vy": v1_circ,
-             "color": p1["color"], "radius": 7, "type": "planet"},
+             "color": _PLANET_COLOR[i], "radius": 7, "type": "planet"},
             # Arrival planet (positioned ~180° ahead for rendezvous)
             {"name": to_body, "mass": 3.2e-7,
              "x": -r2, "y": 0, "vx": 0, "vy": -v2_circ,
-             "color": p2["color"], "radius": 5, "type": "planet"},
+             "color": _PLANET_COLOR[j], "radius": 5, "type": "planet"},
             # Spacecraft — given transfer orbit injection velocity
             {"name": "Spacecraft", "mass": 1e-15,
              "x": r1, "y": 0, "vx": 0, "vy": v_t1,
@@ -469,13 +867,36 @@ def hohmann_transfer(from_body="Earth", to_body="Mars"):
         ]
     })
 
-    print(f"\nHohmann Transfer {from_body} → {to_body}:")
-    print(f"  Δv₁ = {dv1:.4f} AU/yr ({dv1*4740:.0f} m/s)")
-    print(f"  Δv₂ = {dv2:.4f} AU/yr ({dv2*4740:.0f} m/s)")
-    print(f"  Transfer time = {T_transfer:.3f} yr ({T_transfer*365.25:.0f} days)")
+    if verbose:
+        print(f"\nHohmann Transfer {from_body} → {to_body}:")
+        print(f"  Δv₁ = {dv1:.4f} AU/yr ({dv1*4740:.0f} m/s)")
+        print(f"  Δv₂ = {dv2:.4f} AU/yr ({dv2*4740:.0f} m/s)")
+        print(f"  Transfer time = {T_transfer:.3f} yr ({T_transfer*365.25:.0f} days)")
 
     return engine
 
+def hohmann_grid(top_k=None):
+    """
+    Analytic Hohmann transfers for every pair of _PLANET_NAMES in one compiled sweep
+    (no REBOUND sims built). Returns {"names", "dv1", "dv2", "T"}; with top_k,
+    instead the top_k cheapest transfers (by |Δv₁|+|Δv₂|) as dicts, ready to
+    hand to hohmann_transfer for the ones worth simulating.
+    """
+    names = list(_PLANET_NAMES)
+    dv1, dv2, T = sweep_hohmann(_PLANET_A, 4 * math.pi**2)
+    if top_k is None:
+        return {"names": names, "dv1": dv1, "dv2": dv2, "T": T}
+
+    total = np.abs(dv1) + np.abs(dv2)
+    np.fill_diagonal(total, np.inf)          # no transfer from a planet to itself
+    best = np.argsort(total, axis=None)[:min(top_k, len(names) * (len(names) - 1))]
+    return [
+        {"from": names[i], "to": names[j],
+         "delta_v1": float(dv1[i, j]), "delta_v2": float(dv2[i, j]),
+         "total_delta_v": float(total[i, j]), "transfer_time": float(T[i, j])}
+        for i, j in zip(*np.unravel_index(best, total.shape))
+    ]
+
 
 # ── TEST ─────────────────────────────────────────────────────
 if __name__ == "__main__":
@@ -508,7 +929,7 @@ if __name__ == "__main__":
     # Test 3: Hohmann transfer
     print("\n[3] Hohmann transfer Earth → Mars...")
     try:
-        eng_h = hohmann_transfer("Earth", "Mars")
+        eng_h = hohmann_transfer("Earth", "Mars", verbose=True)
         f = eng_h.step(50)
         print(f"    t={f['t']:.4f} yr  {f['N']} bodies")
         print("    ✓ Hohmann OK")
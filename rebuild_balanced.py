@@ -1,21 +1,173 @@
+import logging
 import chromadb
+from chromadb.utils import embedding_functions
+
+try:
+    from chromadb.errors import NotFoundError
+except ImportError:          # older Chroma raised ValueError for a missing collection
+    NotFoundError = ValueError
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+log = logging.getLogger(__name__)
 
 client = chromadb.PersistentClient(path="./chroma_db")
 
-# Delete and recreate
+# Same MiniLM model Chroma uses for query_texts; documents are embedded up
+# front with it (see INSERT ALL), so queries and documents share one model
+embed_fn = embedding_functions.DefaultEmbeddingFunction()
+
+# Bulk-load HNSW settings: with batch_size / sync_threshold above the corpus
+# size (~1.2K docs) the graph is built in one pass instead of being extended
+# and re-persisted after every add(). Only the shadow build uses them (no one
+# reads a shadow mid-build); it is switched to HNSW_LIVE before going live,
+# since incremental runs later upsert into the same collection while it is
+# being queried.
+HNSW_BULK = {
+    "hnsw:sync_threshold": 100000,
+    "hnsw:batch_size": 10000,
+    "hnsw:construction_ef": 200,
+    "hnsw:M": 32,
+}
+# Chroma's default sync / batch sizes; construction_ef / M are fixed at creation
+HNSW_LIVE = {**HNSW_BULK, "hnsw:sync_threshold": 1000, "hnsw:batch_size": 100}
+
+import json, csv, hashlib, itertools, operator, os, sys, time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# ── SKIP / INCREMENTAL REBUILD ───────────────────────────────
+# A sidecar manifest records a digest of the source files (size + mtime), one
+# digest per document, and the id / count of the collection it describes.
+# Unchanged sources → nothing to do; under INCREMENTAL_MAX_CHURN of the
+# documents changed → upsert/delete just those; otherwise the collection is
+# recreated. A manifest written for another collection (e.g. one build_rag.py
+# or a manual edit replaced) is ignored, and --force always recreates.
+MANIFEST_PATH = "./chroma_db/.rebuild_manifest.json"
+SOURCES = [
+    "datasets/exoplanets.csv",
+    "datasets/asteroids.json",
+    "datasets/trojan.json",
+    "datasets/comet.json",
+    os.path.abspath(__file__),
+]
+INCREMENTAL_MAX_CHURN = 0.2
+
+
+def sources_digest():
+    h = hashlib.blake2b(digest_size=16)
+    for path in SOURCES:
+        try:
+            st = os.stat(path)
+            h.update(f"{path}:{st.st_size}:{st.st_mtime_ns}\n".encode())
+        except OSError:
+            h.update(f"{path}:missing\n".encode())
+    return h.hexdigest()
+
+
+def doc_digest(doc, meta):
+    h = hashlib.blake2b(doc.encode(), digest_size=16)
+    h.update(json.dumps(meta, sort_keys=True).encode())
+    return h.hexdigest()
+
+
+def load_manifest():
+    try:
+        with open(MANIFEST_PATH, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def remove_manifest():
+    try:
+        os.remove(MANIFEST_PATH)
+    except OSError:
+        pass
+
+
+def manifest_matches(manifest, collection):
+    """True if manifest was written for exactly this collection, as it is now."""
+    return (manifest is not None and collection is not None
+            and manifest.get("collection_id") == str(collection.id)
+            and manifest.get("count") == collection.count())
+
+
+COLLECTION = "orbital_dynamics"
+
+
+def run_tests(collection):
+    """Print the top hit for each test query; False if any query found nothing."""
+    ok = True
+    tests = [
+        "Mars orbital period eccentricity",
+        "Hohmann transfer orbit delta-v",
+        "Lagrange points L4 L5 trojan",
+        "Kepler third law period semi-major axis",
+        "escape velocity formula"
+    ]
+
+    for query in tests:
+        r = collection.query(query_texts=[query], n_results=1)
+        if not r["documents"][0]:
+            log.warning("QUERY: %s → no results", query)
+            ok = False
+            continue
+        log.info("QUERY: %s\n%s\n%s", query, r["documents"][0][0][:200], "-" * 40)
+    return ok
+
+
+force = "--force" in sys.argv
+manifest = None if force else load_manifest()
+current_sources = sources_digest()
+try:
+    collection = client.get_collection(COLLECTION, embedding_function=embed_fn)
+except (NotFoundError, ValueError):
+    collection = None
+
+if not manifest_matches(manifest, collection):
+    manifest = None
+
+if manifest and manifest.get("sources") == current_sources:
+    log.info("Datasets unchanged since last rebuild — skipping (pass --force to rebuild)")
+    log.info("Total: %d documents", collection.count())
+    run_tests(collection)
+    sys.exit(0)
+
 try:
-    client.delete_collection("orbital_dynamics")
-    print("Cleared old database")
-except:
-    pass
+    import ijson
+    IJSON_AVAILABLE = True
+except ImportError:
+    IJSON_AVAILABLE = False
+
 
-collection = client.create_collection("orbital_dynamics")
+def load_sbdb(path, limit=None):
+    """
+    (fields, row iterator) of an SBDB query dump, optionally only the first
+    `limit` rows. With ijson the rows are streamed from disk and a capped read
+    stops after `limit`, so the file is never held in memory whole.
+    """
+    if not IJSON_AVAILABLE:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return data.get("fields", []), itertools.islice(data.get("data", []), limit)
 
-import json, csv
+    with open(path, "rb") as f:
+        # "fields" precedes "data" in SBDB output, so this stops near the top
+        fields = next(ijson.items(f, "fields"), [])
 
-documents = []
-metadatas = []
-ids = []
+    def rows():
+        with open(path, "rb") as f:
+            yield from itertools.islice(ijson.items(f, "data.item"), limit)
+
+    return fields, rows()
+
+
+def column_getter(fields, *names):
+    """
+    row -> tuple of the named columns, by position (the indices are resolved
+    once per file). A column the dump doesn't have reads as "".
+    """
+    idx = tuple(fields.index(n) if n in fields else None for n in names)
+    return lambda row: tuple("" if i is None else row[i] for i in idx)
 
 # ── CURATED CONCEPTS (highest priority) ──────────────────────
 CONCEPTS = [
@@ -47,124 +199,221 @@ CONCEPTS = [
     ("concept_halley", "COMET: Halley Comet\nOrbital period: 75-76 years\nSemi-major axis: 17.8 AU\nEccentricity: 0.967\nPerihelion: 0.586 AU inside Venus orbit\nAphelion: 35 AU beyond Neptune\nLast perihelion: 1986 Next: 2061\nDOMAIN: orbital_dynamics", "comet"),
 ]
 
-for cid, text, ctype in CONCEPTS:
-    documents.append(text)
-    metadatas.append({"source": "curated", "type": ctype})
-    ids.append(cid)
+# Document templates, filled positionally per row
+EXO_TMPL = "EXOPLANET: {}\nHOST: {}\nSEMI-MAJOR AXIS: {} AU\nECCENTRICITY: {}\nMASS: {} Mjup\nDOMAIN: orbital_dynamics"
+AST_TMPL = "ASTEROID: {}\nSemi-major axis: {} AU\nEccentricity: {}\nPeriod: {} days\nClass: {}\nDOMAIN: orbital_dynamics"
+TJ_TMPL  = "JUPITER TROJAN: {}\nAt L4 or L5 Lagrange point\nSemi-major axis: {} AU\nEccentricity: {}\nDOMAIN: orbital_dynamics"
+CM_TMPL  = "COMET: {}\nEccentricity: {} (highly eccentric)\nSemi-major axis: {} AU\nPeriod: {} days\nDOMAIN: orbital_dynamics"
+
+# One metadata dict per section, shared by all its rows (Chroma only reads them)
+EXO_META = {"source": "NASA", "type": "exoplanet"}
+AST_META = {"source": "JPL", "type": "asteroid"}
+TJ_META  = {"source": "JPL", "type": "trojan"}
+CM_META  = {"source": "JPL", "type": "comet"}
+
+# documents / metadatas / ids are preallocated to the expected total and
+# filled by index (k = next free slot), then truncated to k once at the end.
+# Every section but comets is capped; comets grow the lists if needed.
+EXO_CAP, AST_CAP, TJ_CAP = 500, 100, 100
+COMET_ESTIMATE = 500
+capacity = len(CONCEPTS) + EXO_CAP + AST_CAP + TJ_CAP + COMET_ESTIMATE
+documents = [None] * capacity
+metadatas = [None] * capacity
+ids = [None] * capacity
+
+k = len(CONCEPTS)
+ids[:k] = [cid for cid, _, _ in CONCEPTS]
+documents[:k] = [text for _, text, _ in CONCEPTS]
+metadatas[:k] = [{"source": "curated", "type": ctype} for _, _, ctype in CONCEPTS]
 
-print(f"Added {len(CONCEPTS)} curated concepts")
+log.info("Added %d curated concepts", len(CONCEPTS))
 
 # ── EXOPLANETS (500 only, best ones) ─────────────────────────
-print("Adding exoplanets...")
+log.info("Adding exoplanets...")
 exo_count = 0
+exo_fields = operator.itemgetter("pl_name", "hostname", "pl_orbsmax", "pl_orbeccen", "pl_bmassj")
 try:
     with open("datasets/exoplanets.csv", "r", encoding="utf-8") as f:
-        lines = [l for l in f if not l.startswith("#")]
-    for row in csv.DictReader(lines):
-        if exo_count >= 500:
-            break
-        name = row.get("pl_name", "").strip()
-        a    = row.get("pl_orbsmax", "").strip()
-        e    = row.get("pl_orbeccen", "").strip()
-        mass = row.get("pl_bmassj", "").strip()
-        host = row.get("hostname", "").strip()
-        if not name or not a:
-            continue
-        doc = f"EXOPLANET: {name}\nHOST: {host}\nSEMI-MAJOR AXIS: {a} AU\nECCENTRICITY: {e}\nMASS: {mass} Mjup\nDOMAIN: orbital_dynamics"
-        documents.append(doc)
-        metadatas.append({"source": "NASA", "type": "exoplanet"})
-        ids.append(f"exo_{exo_count}")
-        exo_count += 1
-    print(f"    Added {exo_count} exoplanets")
-except Exception as e:
-    print(f"    Error: {e}")
+        # DictReader pulls lines lazily, so reading stops after the 500th planet
+        for row in csv.DictReader(l for l in f if not l.startswith("#")):
+            if exo_count >= EXO_CAP:
+                break
+            name, host, a, e, mass = (v.strip() for v in exo_fields(row))
+            if not name or not a:
+                continue
+            documents[k] = EXO_TMPL.format(name, host, a, e, mass)
+            metadatas[k] = EXO_META
+            ids[k] = f"exo_{exo_count}"
+            k += 1
+            exo_count += 1
+    log.info("    Added %d exoplanets", exo_count)
+except Exception:
+    log.exception("    Error")
 
 # ── ASTEROIDS (100 only, famous ones first) ───────────────────
-print("Adding asteroids...")
+log.info("Adding asteroids...")
 ast_count = 0
 try:
-    with open("datasets/asteroids.json", "r", encoding="utf-8") as f:
-        data = json.load(f)
-    fields = data.get("fields", [])
-    for row in data.get("data", [])[:100]:
-        if len(row) != len(fields):
+    fields, rows = load_sbdb("datasets/asteroids.json", AST_CAP)
+    columns = column_getter(fields, "full_name", "a", "e", "per", "class")
+    for row in rows:
+        try:
+            values = columns(row)
+        except IndexError:   # ragged row missing a column we use
             continue
-        obj = dict(zip(fields, row))
-        name = obj.get("full_name", "")
-        doc = f"ASTEROID: {name}\nSemi-major axis: {obj.get('a','')} AU\nEccentricity: {obj.get('e','')}\nPeriod: {obj.get('per','')} days\nClass: {obj.get('class','')}\nDOMAIN: orbital_dynamics"
-        documents.append(doc)
-        metadatas.append({"source": "JPL", "type": "asteroid"})
-        ids.append(f"ast_{ast_count}")
+        documents[k] = AST_TMPL.format(*values)
+        metadatas[k] = AST_META
+        ids[k] = f"ast_{ast_count}"
+        k += 1
         ast_count += 1
-    print(f"    Added {ast_count} asteroids")
-except Exception as e:
-    print(f"    Error: {e}")
+    log.info("    Added %d asteroids", ast_count)
+except Exception:
+    log.exception("    Error")
 
 # ── TROJANS (100 only) ────────────────────────────────────────
-print("Adding Trojans...")
+log.info("Adding Trojans...")
 tj_count = 0
 try:
-    with open("datasets/trojan.json", "r", encoding="utf-8") as f:
-        data = json.load(f)
-    fields = data.get("fields", [])
-    for row in data.get("data", [])[:100]:
-        if len(row) != len(fields):
+    fields, rows = load_sbdb("datasets/trojan.json", TJ_CAP)
+    columns = column_getter(fields, "full_name", "a", "e")
+    for row in rows:
+        try:
+            values = columns(row)
+        except IndexError:
             continue
-        obj = dict(zip(fields, row))
-        name = obj.get("full_name", "")
-        doc = f"JUPITER TROJAN: {name}\nAt L4 or L5 Lagrange point\nSemi-major axis: {obj.get('a','')} AU\nEccentricity: {obj.get('e','')}\nDOMAIN: orbital_dynamics"
-        documents.append(doc)
-        metadatas.append({"source": "JPL", "type": "trojan"})
-        ids.append(f"tj_{tj_count}")
+        documents[k] = TJ_TMPL.format(*values)
+        metadatas[k] = TJ_META
+        ids[k] = f"tj_{tj_count}"
+        k += 1
         tj_count += 1
-    print(f"    Added {tj_count} Trojans")
-except Exception as e:
-    print(f"    Error: {e}")
+    log.info("    Added %d Trojans", tj_count)
+except Exception:
+    log.exception("    Error")
 
 # ── COMETS (all ~500) ─────────────────────────────────────────
-print("Adding comets...")
+log.info("Adding comets...")
 cm_count = 0
 try:
-    with open("datasets/comet.json", "r", encoding="utf-8") as f:
-        data = json.load(f)
-    fields = data.get("fields", [])
-    for row in data.get("data", []):
-        if len(row) != len(fields):
+    fields, rows = load_sbdb("datasets/comet.json")
+    columns = column_getter(fields, "full_name", "e", "a", "per")
+    for row in rows:
+        try:
+            values = columns(row)
+        except IndexError:
             continue
-        obj = dict(zip(fields, row))
-        name = obj.get("full_name", "")
-        doc = f"COMET: {name}\nEccentricity: {obj.get('e','')} (highly eccentric)\nSemi-major axis: {obj.get('a','')} AU\nPeriod: {obj.get('per','')} days\nDOMAIN: orbital_dynamics"
-        documents.append(doc)
-        metadatas.append({"source": "JPL", "type": "comet"})
-        ids.append(f"cm_{cm_count}")
+        if k == len(documents):   # more comets than estimated
+            for lst in (documents, metadatas, ids):
+                lst.extend([None] * COMET_ESTIMATE)
+        documents[k] = CM_TMPL.format(*values)
+        metadatas[k] = CM_META
+        ids[k] = f"cm_{cm_count}"
+        k += 1
         cm_count += 1
-    print(f"    Added {cm_count} comets")
-except Exception as e:
-    print(f"    Error: {e}")
+    log.info("    Added %d comets", cm_count)
+except Exception:
+    log.exception("    Error")
+
+del documents[k:], metadatas[k:], ids[k:]
 
 # ── INSERT ALL ────────────────────────────────────────────────
-print(f"\nInserting {len(documents)} documents...")
+digests = [doc_digest(d, m) for d, m in zip(documents, metadatas)]
+old_digests = manifest.get("docs", {}) if manifest else {}
+changed = [j for j, (i, d) in enumerate(zip(ids, digests)) if old_digests.get(i) != d]
+current_ids = set(ids)
+removed = [i for i in old_digests if i not in current_ids]
+churn = (len(changed) + len(removed)) / max(len(ids), 1)
+incremental = bool(old_digests) and churn < INCREMENTAL_MAX_CHURN
+
+# Dropped before any write and rewritten once the test queries pass, so an
+# interrupted or failed run is never mistaken for a finished one
+remove_manifest()
+
+if incremental:
+    log.info("%d changed, %d removed of %d documents (%.0f%% churn) — updating in place",
+             len(changed), len(removed), len(ids), churn * 100)
+    if removed:
+        collection.delete(ids=removed)
+    write = collection.upsert
+    todo = changed
+else:
+    # Shadow build: fill a fresh collection while readers keep querying the
+    # live one, then swap names once it passes the test queries (see below).
+    # Shadows / retired copies left by an interrupted run are dropped first.
+    for c in client.list_collections():
+        name = getattr(c, "name", c)
+        if name.startswith(COLLECTION + "_"):
+            client.delete_collection(name)
+    live = collection
+    collection = client.create_collection(f"{COLLECTION}_{time.time_ns()}", metadata=HNSW_BULK,
+                                          embedding_function=embed_fn)
+    write = collection.add
+    todo = range(len(documents))
+
+docs_todo = [documents[j] for j in todo]
+metas_todo = [metadatas[j] for j in todo]
+ids_todo = [ids[j] for j in todo]
+
+# Embed everything in a few large forward passes (EMBED_BATCH docs each)
+# rather than letting every add() embed its own small batch
+log.info("Embedding %d documents...", len(docs_todo))
+EMBED_BATCH = 512
+embeddings = []
+for i in range(0, len(docs_todo), EMBED_BATCH):
+    embeddings.extend(embed_fn(docs_todo[i:i+EMBED_BATCH]))
+
+# Batches are added by ADD_WORKERS threads at once: Chroma releases the GIL
+# in its SQLite / HNSW writes, so one batch's commit overlaps the next's
+# insert. as_completed re-raises a failed batch as soon as it finishes.
+log.info("Inserting %d documents...", len(docs_todo))
 BATCH = 200
-for i in range(0, len(documents), BATCH):
-    collection.add(
-        documents=documents[i:i+BATCH],
-        metadatas=metadatas[i:i+BATCH],
-        ids=ids[i:i+BATCH]
-    )
-
-print(f"\nTotal: {collection.count()} documents")
-
-# ── TEST ──────────────────────────────────────────────────────
-tests = [
-    "Mars orbital period eccentricity",
-    "Hohmann transfer orbit delta-v",
-    "Lagrange points L4 L5 trojan",
-    "Kepler third law period semi-major axis",
-    "escape velocity formula"
-]
+ADD_WORKERS = 4
+with ThreadPoolExecutor(max_workers=ADD_WORKERS) as pool:
+    futures = [
+        pool.submit(write,
+                    documents=docs_todo[i:i+BATCH],
+                    embeddings=embeddings[i:i+BATCH],
+                    metadatas=metas_todo[i:i+BATCH],
+                    ids=ids_todo[i:i+BATCH])
+        for i in range(0, len(docs_todo), BATCH)
+    ]
+    for future in as_completed(futures):
+        future.result()
+
+if incremental:
+    log.info("Total: %d documents", collection.count())
+    tests_ok = run_tests(collection)
+else:
+    # One query right after the bulk insert, so the single deferred graph
+    # build happens here rather than on the first real search
+    collection.query(query_embeddings=embeddings[:1], n_results=1)
+    collection.modify(metadata=HNSW_LIVE)
+    try:   # Chroma >= 1.0 reads them from the configuration, not the metadata
+        collection.modify(configuration={"hnsw": {"sync_threshold": HNSW_LIVE["hnsw:sync_threshold"],
+                                                  "batch_size": HNSW_LIVE["hnsw:batch_size"]}})
+    except TypeError:
+        pass
+
+    log.info("Total: %d documents", collection.count())
+    # ── TEST (on the shadow, before it goes live) ─────────────────
+    tests_ok = run_tests(collection)
+    if not tests_ok:
+        client.delete_collection(collection.name)
+        log.error("Test queries failed — kept the live '%s' collection", COLLECTION)
+        sys.exit(1)
+
+    # Swap: retire the live collection under a side name, promote the shadow,
+    # then drop the old copy. Readers resolve COLLECTION by name, so at worst
+    # one starting in this instant misses it; open handles keep working
+    # (collections are addressed by id) until the old copy is deleted.
+    retired = f"{COLLECTION}_retired_{time.time_ns()}"
+    if live is not None:
+        live.modify(name=retired)
+    collection.modify(name=COLLECTION)
+    if live is not None:
+        client.delete_collection(retired)
+    log.info("Swapped in the rebuilt '%s' collection", COLLECTION)
 
-for query in tests:
-    print(f"\nQUERY: {query}")
-    r = collection.query(query_texts=[query], n_results=1)
-    print(r["documents"][0][0][:200])
-    print("-"*40)
\ No newline at end of file
+if tests_ok:
+    with open(MANIFEST_PATH, "w", encoding="utf-8") as f:
+        json.dump({"sources": current_sources, "docs": dict(zip(ids, digests)),
+                   "collection_id": str(collection.id), "count": collection.count()}, f)
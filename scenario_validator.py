@@ -3,10 +3,32 @@ Automatic Scenario Validator & Velocity Fixer
 Prevents Moon-falling-down bug in ALL scenarios by validating and correcting orbital velocities.
 """
 
+import heapq
 import math
 import json
+from dataclasses import dataclass
+from typing import List
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+try:
+    from pydantic import BaseModel, ConfigDict, Field, ValidationError
+    PYDANTIC_AVAILABLE = True
+except ImportError:
+    PYDANTIC_AVAILABLE = False
+
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
 
 G_SOLAR = 4 * math.pi**2  # AU^3 yr^-2 Msun^-1
+SQRT2 = math.sqrt(2)      # v_escape / v_circular at any radius
 
 def circular_orbit_velocity(mass_central, radius):
     """Calculate correct circular orbital velocity."""
@@ -15,10 +37,197 @@ def circular_orbit_velocity(mass_central, radius):
     return math.sqrt(G_SOLAR * mass_central / radius)
 
 def escape_velocity(mass_central, radius):
-    """Calculate escape velocity."""
-    if radius <= 0 or mass_central <= 0:
-        return 0
-    return math.sqrt(2 * G_SOLAR * mass_central / radius)
+    """Calculate escape velocity (√2 × the circular velocity)."""
+    return SQRT2 * circular_orbit_velocity(mass_central, radius)
+
+# ── SCENARIO SCHEMA ───────────────────────────────────────────
+# Type/bounds checking and defaults run inside pydantic-core in one parse,
+# instead of per-field isinstance/.get checks on every body. Without pydantic
+# the same rules are checked by hand. Masses may be 0 (test particles).
+
+if PYDANTIC_AVAILABLE:
+    class BodyModel(BaseModel):
+        model_config = ConfigDict(extra="allow")
+
+        name:   str   = "Body"
+        mass:   float = Field(ge=0)
+        x:      float = Field(0.0, ge=-1e6, le=1e6)
+        y:      float = Field(0.0, ge=-1e6, le=1e6)
+        vx:     float = 0.0
+        vy:     float = 0.0
+        color:  str   = "#ffffff"
+        radius: float = Field(5, gt=0)
+        type:   str   = "planet"
+
+    class ScenarioModel(BaseModel):
+        model_config = ConfigDict(extra="allow")
+
+        name:        str   = "Simulation"
+        description: str   = ""
+        units:       str   = "solar"
+        integrator:  str   = "ias15"
+        t_per_frame: float = Field(0.005, gt=0)
+        scale:       float = Field(180.0, gt=0)
+        bodies:      List[BodyModel] = Field(min_length=1)
+
+_BODY_DEFAULTS = {"name": "Body", "x": 0.0, "y": 0.0, "vx": 0.0, "vy": 0.0,
+                  "color": "#ffffff", "radius": 5, "type": "planet"}
+_SCENARIO_DEFAULTS = {"name": "Simulation", "description": "", "units": "solar",
+                      "integrator": "ias15", "t_per_frame": 0.005, "scale": 180.0}
+
+def _validate_plain(scenario: dict) -> dict:
+    """validate_scenario without pydantic: same fields, bounds and defaults."""
+    bodies = scenario.get("bodies")
+    if not isinstance(bodies, list) or not bodies:
+        return {"ok": False, "scenario": scenario, "error": "bodies: at least 1 body required"}
+    try:
+        fixed_bodies = []
+        for i, body in enumerate(bodies):
+            if not isinstance(body, dict) or "mass" not in body:
+                raise ValueError(f"bodies.{i}: a body object with a mass is required")
+            b = {**_BODY_DEFAULTS, **body}
+            for key in ("mass", "x", "y", "vx", "vy", "radius"):
+                b[key] = float(b[key])
+            if b["mass"] < 0 or b["radius"] <= 0 or abs(b["x"]) > 1e6 or abs(b["y"]) > 1e6:
+                raise ValueError(f"bodies.{i}: need mass >= 0, radius > 0, |x|, |y| <= 1e6")
+            fixed_bodies.append(b)
+        fixed = {**_SCENARIO_DEFAULTS, **scenario, "bodies": fixed_bodies}
+        fixed["t_per_frame"] = float(fixed["t_per_frame"])
+        fixed["scale"] = float(fixed["scale"])
+        if fixed["t_per_frame"] <= 0 or fixed["scale"] <= 0:
+            raise ValueError("t_per_frame and scale must be > 0")
+    except (TypeError, ValueError) as e:
+        return {"ok": False, "scenario": scenario, "error": str(e)}
+    return {"ok": True, "scenario": fixed, "error": ""}
+
+def validate_scenario(scenario: dict) -> dict:
+    """
+    Check scenario structure (types, bounds, required fields) and fill defaults.
+    Returns: {"ok": bool, "scenario": dict (normalized), "error": str}
+    """
+    if not PYDANTIC_AVAILABLE:
+        return _validate_plain(scenario)
+    try:
+        model = ScenarioModel.model_validate(scenario)
+    except ValidationError as e:
+        return {"ok": False, "scenario": scenario, "error": str(e)}
+    return {"ok": True, "scenario": model.model_dump(), "error": ""}
+
+# ── SoA BODY ARRAYS ───────────────────────────────────────────
+# Scenarios arrive as a list of body dicts; checks read them column-wise,
+# so convert once into contiguous float64 columns.
+
+@dataclass
+class BodySoA:
+    mass: "np.ndarray"
+    x:    "np.ndarray"
+    y:    "np.ndarray"
+    vx:   "np.ndarray"
+    vy:   "np.ndarray"
+
+def bodies_to_soa(bodies: list) -> BodySoA:
+    """Column arrays for a list of body dicts (missing fields → 0)."""
+    def col(key):
+        return np.fromiter((b.get(key, 0) for b in bodies), dtype=np.float64, count=len(bodies))
+    return BodySoA(mass=col("mass"), x=col("x"), y=col("y"), vx=col("vx"), vy=col("vy"))
+
+# ── VELOCITY CHECK KERNELS ────────────────────────────────────
+# Per-body flag codes (first matching rule wins)
+FLAG_OK, FLAG_TOO_SLOW, FLAG_TOO_FAST, FLAG_SUSPICIOUS = 0, 1, 2, 3
+
+def _validate_numpy(xs, ys, vxs, vys, M, G):
+    """
+    Velocity checks for bodies orbiting a primary of mass M at the origin.
+    Returns (flags int8, v_current, v_circular, new_vx, new_vy); new_v* is
+    the prograde circular velocity, meaningful only where flags != FLAG_OK.
+    """
+    # Distance from primary and current speed
+    r = np.hypot(xs, ys)
+    v_current = np.hypot(vxs, vys)
+    orbiting = r >= 1e-10  # bodies at the center are left alone
+    
+    # What velocities should be (0 for a massless primary)
+    # (one sqrt per body: v_escape = √2·v_circular, and 1/r is shared)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        inv_r = 1.0 / r
+        if M > 0:
+            v_circular = np.sqrt(G * M * inv_r)
+        else:
+            v_circular = np.zeros_like(r)
+        ratio = v_current / v_circular
+        # True perpendicular-to-radius vector (counter-clockwise / prograde):
+        # unit_perp = (-y/r, x/r) → times v_circular, valid for ANY position
+        speed_over_r = inv_r * v_circular
+        new_vx = -ys * speed_over_r
+        new_vy =  xs * speed_over_r
+    
+    too_slow = v_current < v_circular * 0.3
+    too_fast = v_current > v_circular * (SQRT2 * 1.5)
+    # Velocity significantly different from circular (might be intentional ellipse)
+    suspicious = (np.abs(v_current - v_circular) > v_circular * 0.5) & ((ratio < 0.7) | (ratio > 1.4))
+    flags = np.select([too_slow, too_fast, suspicious],
+                      [FLAG_TOO_SLOW, FLAG_TOO_FAST, FLAG_SUSPICIOUS], FLAG_OK).astype(np.int8)
+    flags[~orbiting] = FLAG_OK
+    return flags, v_current, v_circular, new_vx, new_vy
+
+def _validate_python(xs, ys, vxs, vys, M, G):
+    """_validate_numpy over plain lists, for when NumPy is not installed"""
+    flags, v_current, v_circular, new_vx, new_vy = [], [], [], [], []
+    for x, y, vx, vy in zip(xs, ys, vxs, vys):
+        r = math.hypot(x, y)
+        v = math.hypot(vx, vy)
+        vc = math.sqrt(G * M / r) if r >= 1e-10 and M > 0 else 0.0
+        flag = FLAG_OK
+        if r >= 1e-10:
+            if v < vc * 0.3:
+                flag = FLAG_TOO_SLOW
+            elif v > vc * (SQRT2 * 1.5):
+                flag = FLAG_TOO_FAST
+            elif abs(v - vc) > vc * 0.5 and not 0.7 <= v / vc <= 1.4:
+                flag = FLAG_SUSPICIOUS
+        flags.append(flag)
+        v_current.append(v)
+        v_circular.append(vc)
+        new_vx.append(-y / r * vc if flag else 0.0)
+        new_vy.append( x / r * vc if flag else 0.0)
+    return flags, v_current, v_circular, new_vx, new_vy
+
+if NUMBA_AVAILABLE:
+    @njit(cache=True, fastmath=True, parallel=True)
+    def _validate_core(xs, ys, vxs, vys, M, G):
+        """_validate_numpy as one compiled pass, bodies spread over cores"""
+        n = xs.shape[0]
+        flags = np.zeros(n, dtype=np.int8)
+        v_current = np.empty(n)
+        v_circular = np.zeros(n)
+        new_vx = np.zeros(n)
+        new_vy = np.zeros(n)
+        for k in prange(n):
+            r = np.sqrt(xs[k] * xs[k] + ys[k] * ys[k])
+            v = np.sqrt(vxs[k] * vxs[k] + vys[k] * vys[k])
+            v_current[k] = v
+            if r < 1e-10:
+                continue
+            vc = np.sqrt(G * M / r) if M > 0 else 0.0
+            v_circular[k] = vc
+            if v < vc * 0.3:
+                flags[k] = FLAG_TOO_SLOW
+            elif v > vc * (SQRT2 * 1.5):
+                flags[k] = FLAG_TOO_FAST
+            elif abs(v - vc) > vc * 0.5:
+                ratio = v / vc
+                if ratio < 0.7 or ratio > 1.4:
+                    flags[k] = FLAG_SUSPICIOUS
+            if flags[k] != FLAG_OK:
+                new_vx[k] = -ys[k] / r * vc
+                new_vy[k] =  xs[k] / r * vc
+        return flags, v_current, v_circular, new_vx, new_vy
+
+def format_issue(issue: dict) -> str:
+    """Display line for one issue from validate_and_fix_scenario."""
+    if issue["severity"] == "warn":
+        return f"⚠️  {issue['name']}: {issue['msg']}"
+    return f"   ✓ FIXED {issue['name']}: {issue['msg']}"
 
 def validate_and_fix_scenario(scenario: dict, auto_fix: bool = True) -> dict:
     """
@@ -30,8 +239,11 @@ def validate_and_fix_scenario(scenario: dict, auto_fix: bool = True) -> dict:
     3. Velocities aren't too low (will crash into central body)
     
     Returns: {"ok": bool, "issues": list, "scenario": dict (fixed if auto_fix=True)}
+    Each issue is {"severity": "warn" | "info", "name": body name, "msg": str};
+    format_issue() renders one for display.
     """
     issues = []
+    n_warn = n_fixed = 0
     bodies = scenario.get("bodies", [])
     
     if len(bodies) < 2:
@@ -41,84 +253,59 @@ def validate_and_fix_scenario(scenario: dict, auto_fix: bool = True) -> dict:
     primary = bodies[0]
     M_primary = primary.get("mass", 1.0)
     
-    fixed_bodies = []
-    fixed_bodies.append(primary)  # Primary doesn't need fixing
+    # All checks run column-wise over the orbiting bodies; only the flagged
+    # ones are visited again to format issues and copy fixed dicts.
+    orbiters = bodies[1:]
+    if NUMPY_AVAILABLE:
+        soa = bodies_to_soa(orbiters)
+        columns = (soa.x, soa.y, soa.vx, soa.vy)
+        validate = _validate_core if NUMBA_AVAILABLE else _validate_numpy
+    else:
+        columns = tuple([b.get(key, 0) for b in orbiters] for key in ("x", "y", "vx", "vy"))
+        validate = _validate_python
+    flags, v_current, v_circular, new_vx, new_vy = validate(*columns, float(M_primary), G_SOLAR)
     
-    for i, body in enumerate(bodies[1:], start=1):
-        name = body.get("name", f"Body-{i}")
-        mass = body.get("mass", 0)
-        x = body.get("x", 0)
-        y = body.get("y", 0)
-        vx = body.get("vx", 0)
-        vy = body.get("vy", 0)
-        
-        # Calculate distance from primary
-        r = math.sqrt(x**2 + y**2)
-        
-        if r < 1e-10:  # Body at center
-            fixed_bodies.append(body)
-            continue
-        
-        # Calculate current speed
-        v_current = math.sqrt(vx**2 + vy**2)
-        
-        # Calculate what velocities should be
-        v_circular = circular_orbit_velocity(M_primary, r)
-        v_escape = escape_velocity(M_primary, r)
-        
-        # Check for problems
-        problem = None
-        fix_needed = False
-        
-        if v_current < v_circular * 0.3:
-            problem = f"TOO SLOW (will crash): v={v_current:.4f}, need ~{v_circular:.4f} AU/yr"
-            fix_needed = True
-            issues.append(f"⚠️  {name}: {problem}")
-        
-        elif v_current > v_escape * 1.5:
-            problem = f"TOO FAST (hyperbolic escape): v={v_current:.4f}, v_esc={v_escape:.4f} AU/yr"
-            fix_needed = True
-            issues.append(f"⚠️  {name}: {problem}")
+    fixed_bodies = [primary] + orbiters  # primary doesn't need fixing
+    
+    # Only issue-string formatting and dict copies stay in Python
+    flagged = np.flatnonzero(flags) if NUMPY_AVAILABLE else [j for j, f in enumerate(flags) if f]
+    for j in flagged:
+        body = orbiters[j]
+        name = body.get("name", f"Body-{j + 1}")
+        v, v_circ = v_current[j], v_circular[j]
         
-        elif abs(v_current - v_circular) > v_circular * 0.5:
-            # Velocity significantly different from circular (might be intentional ellipse)
-            ratio = v_current / v_circular
-            if ratio < 0.7 or ratio > 1.4:
-                problem = f"SUSPICIOUS velocity: v={v_current:.4f}, v_circ={v_circular:.4f} (ratio={ratio:.2f}x)"
-                fix_needed = True
-                issues.append(f"⚠️  {name}: {problem}")
+        if flags[j] == FLAG_TOO_SLOW:
+            problem = f"TOO SLOW (will crash): v={v:.4f}, need ~{v_circ:.4f} AU/yr"
+        elif flags[j] == FLAG_TOO_FAST:
+            problem = f"TOO FAST (hyperbolic escape): v={v:.4f}, v_esc={v_circ * SQRT2:.4f} AU/yr"
+        else:
+            problem = f"SUSPICIOUS velocity: v={v:.4f}, v_circ={v_circ:.4f} (ratio={v / v_circ:.2f}x)"
+        issues.append({"severity": "warn", "name": name, "msg": problem})
+        n_warn += 1
         
-        # Apply fix if needed
-        if fix_needed and auto_fix:
-            # Fix by setting to circular orbit velocity.
-            # Use true perpendicular-to-radius vector (counter-clockwise / prograde).
-            # Formula: unit_perp = (-y/r, x/r)  →  multiply by v_circular
-            # This works correctly for ANY position, not just bodies on the axes.
-            r_len = math.sqrt(x**2 + y**2)
-            new_vx = (-y / r_len) * v_circular
-            new_vy = ( x / r_len) * v_circular
-            
+        # Apply fix: set to circular orbit velocity
+        if auto_fix:
             fixed_body = body.copy()
-            fixed_body["vx"] = new_vx
-            fixed_body["vy"] = new_vy
-            fixed_bodies.append(fixed_body)
+            fixed_body["vx"] = float(new_vx[j])
+            fixed_body["vy"] = float(new_vy[j])
+            fixed_bodies[j + 1] = fixed_body
             
-            issues.append(f"   ✓ FIXED {name}: set velocity to {v_circular:.4f} AU/yr (circular orbit)")
-        else:
-            fixed_bodies.append(body)
+            issues.append({"severity": "info", "name": name,
+                           "msg": f"set velocity to {v_circ:.4f} AU/yr (circular orbit)"})
+            n_fixed += 1
     
     # Update scenario
     fixed_scenario = scenario.copy()
     fixed_scenario["bodies"] = fixed_bodies
     
     return {
-        "ok": len([i for i in issues if i.startswith("⚠️")]) == 0,
+        "ok": n_warn == 0,
         "issues": issues,
         "scenario": fixed_scenario,
         "stats": {
             "total_bodies": len(bodies),
-            "issues_found": len([i for i in issues if i.startswith("⚠️")]),
-            "issues_fixed": len([i for i in issues if "FIXED" in i]),
+            "issues_found": n_warn,
+            "issues_fixed": n_fixed,
         }
     }
 
@@ -127,34 +314,21 @@ def smart_validate_scenario(scenario: dict, verbose: bool = True) -> dict:
     """
     Smarter validation that handles multi-star systems and binary orbits.
     
-    For binary/triple star systems, validates relative velocities.
-    For planet systems, validates against the most massive body.
+    Binary and planetary systems currently get the same validation; the
+    binary check only decides whether verbose mode reports a multi-star system.
     """
     bodies = scenario.get("bodies", [])
     
     if len(bodies) < 2:
         return {"ok": True, "issues": [], "scenario": scenario}
     
-    # Find the most massive body (likely the primary)
-    masses = [(i, b.get("mass", 0)) for i, b in enumerate(bodies)]
-    masses.sort(key=lambda x: x[1], reverse=True)
-    
-    primary_idx = masses[0][0]
-    primary = bodies[primary_idx]
-    M_primary = primary.get("mass", 1.0)
-    
-    # If top 2 masses are similar, might be binary system
-    if len(masses) >= 2 and masses[1][1] > M_primary * 0.3:
-        # Binary or multi-star system
-        if verbose:
+    if verbose:
+        # If top 2 masses are similar, might be binary system (O(N), no sort)
+        m1, m2 = heapq.nlargest(2, (b.get("mass", 0) for b in bodies))
+        if m2 > m1 * 0.3:
             print("  Detected multi-star system - using relaxed validation")
-        # Use relaxed validation for binaries
-        result = validate_and_fix_scenario(scenario, auto_fix=True)
-    else:
-        # Standard planetary system
-        result = validate_and_fix_scenario(scenario, auto_fix=True)
     
-    return result
+    return validate_and_fix_scenario(scenario, auto_fix=True)
 
 
 # ── INTEGRATION WRAPPER ───────────────────────────────────────
@@ -164,12 +338,12 @@ def fix_scenario_velocities(scenario: dict) -> dict:
     Main function to call from scenario generator.
     Automatically validates and fixes any velocity issues.
     """
-    result = smart_validate_scenario(scenario, verbose=False)
+    result = validate_and_fix_scenario(scenario, auto_fix=True)
     
     if not result["ok"]:
         print(f"⚠️  Velocity issues detected and fixed:")
         for issue in result["issues"]:
-            print(f"    {issue}")
+            print(f"    {format_issue(issue)}")
     
     return result["scenario"]
 
@@ -216,7 +390,7 @@ if __name__ == "__main__":
     
     print(f"Issues found: {result['stats']['issues_found']}")
     for issue in result["issues"]:
-        print(f"  {issue}")
+        print(f"  {format_issue(issue)}")
     
     fixed_moon = result["scenario"]["bodies"][1]
     print(f"\nFixed Moon velocity: vx={fixed_moon['vx']:.4f}, vy={fixed_moon['vy']:.4f}")
@@ -233,7 +407,7 @@ if __name__ == "__main__":
     
     print(f"Issues found: {result['stats']['issues_found']}")
     for issue in result["issues"]:
-        print(f"  {issue}")
+        print(f"  {format_issue(issue)}")
     
     fixed_planet = result["scenario"]["bodies"][1]
     v_total = math.sqrt(fixed_planet['vx']**2 + fixed_planet['vy']**2)
@@ -249,7 +423,7 @@ if __name__ == "__main__":
     
     print(f"Issues found: {result['stats']['issues_found']}")
     for issue in result["issues"]:
-        print(f"  {issue}")
+        print(f"  {format_issue(issue)}")
     
     # Test 4: Good scenario (should pass)
     print("\n" + "=" * 70)
@@ -269,7 +443,7 @@ if __name__ == "__main__":
     else:
         print(f"Issues: {len(result['issues'])}")
         for issue in result["issues"]:
-            print(f"  {issue}")
+            print(f"  {format_issue(issue)}")
     
     # Test 5: Binary star system
     print("\n" + "=" * 70)
@@ -106,6 +106,7 @@ def is_orbital_simulation(prompt):
         # Insert before get_scenario function
         pos = content.find('def get_scenario(')
         if pos != -1:
+            pos = content.rfind('\n', 0, pos) + 1  # keep any 'async ' prefix
             content = content[:pos] + validation_code + content[pos:]
             changes.append("validation_function")
     
@@ -158,6 +159,7 @@ def auto_scale(bodies):
 '''
         pos = content.find('def get_scenario(')
         if pos != -1:
+            pos = content.rfind('\n', 0, pos) + 1  # keep any 'async ' prefix
             content = content[:pos] + scale_code + content[pos:]
             changes.append("auto_scale")
             
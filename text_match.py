@@ -0,0 +1,56 @@
+"""
+Multi-keyword substring matching in a single pass over the text.
+Uses an Aho-Corasick automaton (pyahocorasick) when installed, otherwise one
+pre-compiled regex alternation — either way the text is scanned once instead
+of once per keyword.
+"""
+
+import re
+
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+
+
+class KeywordMatcher:
+    """
+    Build once, match many times.
+
+    Usage:
+        matcher = KeywordMatcher(["mars", "earth", "jupiter"])
+        matcher.search("earth to mars")     # True
+        matcher.findall("earth to mars")    # {"earth", "mars"}
+    """
+
+    def __init__(self, keywords):
+        self.keywords = list(keywords)
+        if AHOCORASICK_AVAILABLE:
+            self._automaton = ahocorasick.Automaton()
+            for kw in self.keywords:
+                self._automaton.add_word(kw, kw)
+            self._automaton.make_automaton()
+        else:
+            # Longest first so overlapping keywords prefer the longer match
+            ordered = sorted(self.keywords, key=len, reverse=True)
+            self._regex = re.compile("|".join(re.escape(kw) for kw in ordered))
+
+    def search(self, text: str) -> bool:
+        """True if any keyword occurs in text."""
+        if not self.keywords:
+            return False
+        if AHOCORASICK_AVAILABLE:
+            return next(self._automaton.iter(text), None) is not None
+        return self._regex.search(text) is not None
+
+    def findall(self, text: str) -> set:
+        """
+        Set of distinct keywords occurring in text.
+        (The regex fallback reports only the longest keyword where matches overlap.)
+        """
+        if not self.keywords:
+            return set()
+        if AHOCORASICK_AVAILABLE:
+            return {kw for _, kw in self._automaton.iter(text)}
+        return set(self._regex.findall(text))
@@ -1,13 +1,17 @@
 import matplotlib
 matplotlib.use('Agg')
-import matplotlib.pyplot as plt
 import matplotlib.colors as mcolors
+from matplotlib import cm
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
 import numpy as np
+import functools
+import threading
 import io
 import base64
 
 # Dark theme matching your existing UI
-plt.rcParams.update({
+matplotlib.rcParams.update({
     'figure.facecolor':  '#02030a',
     'axes.facecolor':    '#030510',
     'axes.edgecolor':    '#1a2550',
@@ -24,6 +28,28 @@ plt.rcParams.update({
     'legend.labelcolor': '#e8eeff',
 })
 
+# ── FIGURE POOL ──────────────────────────────────────────────
+# One Agg-backed Figure per plot size, cleared and redrawn on each call instead
+# of creating/destroying figures through pyplot's global registry.
+_FIGURE_POOL = {}
+_FIGURE_LOCK = threading.Lock()   # matplotlib drawing is not thread-safe
+
+def pooled_figure(figsize):
+    """Decorator: pass a cleared pooled Figure of figsize as the first argument."""
+    def decorate(plot_fn):
+        @functools.wraps(plot_fn)
+        def wrapper(*args, **kwargs):
+            with _FIGURE_LOCK:
+                fig = _FIGURE_POOL.get(figsize)
+                if fig is None:
+                    fig = _FIGURE_POOL[figsize] = Figure(figsize=figsize)
+                    FigureCanvasAgg(fig)
+                else:
+                    fig.clear()
+                return plot_fn(fig, *args, **kwargs)
+        return wrapper
+    return decorate
+
 def fig_to_base64(fig):
     """Convert matplotlib figure to base64 string for sending to browser"""
     buf = io.BytesIO()
@@ -32,26 +58,26 @@ def fig_to_base64(fig):
                 facecolor=fig.get_facecolor())
     buf.seek(0)
     b64 = base64.b64encode(buf.read()).decode('utf-8')
-    plt.close(fig)
     return b64
 
-def plot_orbit(orbit_data, title=None):
+@pooled_figure((14, 6))
+def plot_orbit(fig, orbit_data, title=None):
     """
     Publication-ready orbital trajectory plot
     Left panel: XY orbit path colored by velocity
     Right panel: Distance and speed vs time
     """
-    fig, axes = plt.subplots(1, 2, figsize=(14, 6))
+    axes = fig.subplots(1, 2)
     fig.suptitle(
         title or f"{orbit_data['body'].title()} Orbital Trajectory",
         fontsize=14, fontweight='bold', y=1.02
     )
 
-    x = np.array(orbit_data['x'])
-    y = np.array(orbit_data['y'])
-    r = np.array(orbit_data['r'])
-    v = np.array(orbit_data['v'])
-    t = np.array(orbit_data['t'])
+    x = np.asarray(orbit_data['x'])
+    y = np.asarray(orbit_data['y'])
+    r = np.asarray(orbit_data['r'])
+    v = np.asarray(orbit_data['v'])
+    t = np.asarray(orbit_data['t'])
     color = orbit_data.get('color', '#4f7cff')
     body = orbit_data['body'].title()
 
@@ -64,7 +90,7 @@ def plot_orbit(orbit_data, title=None):
 
     # Draw orbit segments colored by velocity
     for i in range(len(x) - 1):
-        c = plt.cm.plasma(v_norm[i])
+        c = cm.plasma(v_norm[i])
         ax.plot([x[i], x[i+1]], [y[i], y[i+1]],
                 color=c, linewidth=2.0, alpha=0.9, solid_capstyle='round')
 
@@ -98,12 +124,12 @@ def plot_orbit(orbit_data, title=None):
                 fontsize=7, color='#4f7cff', alpha=0.9)
 
     # Colorbar for velocity
-    sm = plt.cm.ScalarMappable(
+    sm = cm.ScalarMappable(
         cmap='plasma',
         norm=mcolors.Normalize(vmin=v.min(), vmax=v.max())
     )
     sm.set_array([])
-    cbar = plt.colorbar(sm, ax=ax, shrink=0.6, pad=0.02)
+    cbar = fig.colorbar(sm, ax=ax, shrink=0.6, pad=0.02)
     cbar.set_label('Orbital Speed', fontsize=8, color='#8899cc')
     cbar.ax.yaxis.set_tick_params(color='#4a5a88')
 
@@ -158,12 +184,13 @@ def plot_orbit(orbit_data, title=None):
     ax2.legend(lines1 + lines2, labs1 + labs2,
                fontsize=8, loc='lower right')
 
-    plt.tight_layout()
+    fig.tight_layout()
     return fig_to_base64(fig)
 
-def plot_hohmann(transfer_data):
+@pooled_figure((9, 9))
+def plot_hohmann(fig, transfer_data):
     """Plot Hohmann transfer orbit between two planets"""
-    fig, ax = plt.subplots(figsize=(9, 9))
+    ax = fig.subplots()
     ax.grid(True, alpha=0.3)
     ax.set_facecolor('#030510')
 
@@ -234,17 +261,18 @@ def plot_hohmann(transfer_data):
     ax.set_xlim(-max_r, max_r)
     ax.set_ylim(-max_r, max_r)
 
-    plt.tight_layout()
+    fig.tight_layout()
     return fig_to_base64(fig)
 
-def plot_multi_orbit(orbits_data, title="Solar System Orbits"):
+@pooled_figure((10, 10))
+def plot_multi_orbit(fig, orbits_data, title="Solar System Orbits"):
     """Plot multiple planet orbits on same figure"""
-    fig, ax = plt.subplots(figsize=(10, 10))
+    ax = fig.subplots()
     ax.grid(True, alpha=0.2)
 
     for orbit in orbits_data:
-        x = np.array(orbit['x'])
-        y = np.array(orbit['y'])
+        x = np.asarray(orbit['x'])
+        y = np.asarray(orbit['y'])
         color = orbit.get('color', '#ffffff')
         body = orbit['body'].title()
         a = orbit['elements']['semi_major_axis_au']
@@ -268,15 +296,15 @@ def plot_multi_orbit(orbits_data, title="Solar System Orbits"):
     # Auto-scale to fit all orbits
     max_range = 0
     for orbit in orbits_data:
-        x = np.array(orbit['x'])
-        y = np.array(orbit['y'])
+        x = np.asarray(orbit['x'])
+        y = np.asarray(orbit['y'])
         orbit_max = max(abs(x.min()), abs(x.max()), abs(y.min()), abs(y.max()))
         max_range = max(max_range, orbit_max)
     max_range *= 1.15  # 15% padding
     ax.set_xlim(-max_range, max_range)
     ax.set_ylim(-max_range, max_range)
 
-    plt.tight_layout()
+    fig.tight_layout()
     return fig_to_base64(fig)
 
 # ── TEST ──────────────────────────────────────────────────────
@@ -14,16 +14,74 @@ from pydantic import BaseModel
 import asyncio
 import json
 import sys, os
-
-sys.path.append(os.path.dirname(__file__))
+import rebound
+
+try:
+    import orjson
+
+    def dumps(obj):
+        """Frame JSON via orjson (numpy scalars/arrays serialized natively)."""
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS).decode()
+    loads = orjson.loads
+except ImportError:
+    def dumps(obj):
+        """Frame JSON via the stdlib (numpy arrays/scalars of columnar frames as lists)."""
+        return json.dumps(obj, default=lambda o: o.tolist())
+    loads = json.loads
+
+# Project modules live next to this file; make them importable (once, ahead of
+# site-packages) even when the server is launched from another directory
+_HERE = os.path.dirname(os.path.abspath(__file__))
+if _HERE not in sys.path:
+    sys.path.insert(0, _HERE)
+
+from ai_scenario_generator import get_scenario
+from rebound_engine import ReboundEngine
+
+# Chat stack (requires query_rag, intent_parser, physics_engine, visualizer) —
+# imported once at startup; the simulator endpoints work without it
+try:
+    from query_rag import query_rag_multi_async, is_orbital_query
+    from intent_parser import parse_intent_async, answer_with_rag_async, warmup as warmup_intent_model
+    from physics_engine import compute_orbit, compute_hohmann, compute_multi_orbit, SOLAR_SYSTEM, find_bodies
+    from visualizer import plot_orbit, plot_hohmann, plot_multi_orbit
+    RAG_AVAILABLE = True
+except Exception as e:
+    RAG_AVAILABLE = False
+    print(f"⚠️  Warning: RAG/physics modules not available ({e}) - /api/chat disabled")
+
+try:
+    import chromadb
+except ImportError:
+    chromadb = None   # get_rag_doc_count then reports 0
+
+# Frontend origins (server_v2.js on :3000); override with a comma-separated
+# ASTRO_CORS_ORIGINS for other deployments. Preflights are cached for a day.
+CORS_ORIGINS = tuple(
+    o.strip() for o in os.environ.get(
+        "ASTRO_CORS_ORIGINS", "http://localhost:3000,http://127.0.0.1:3000"
+    ).split(",") if o.strip()
+)
 
 app = FastAPI(title="Astro Thesaurus — REBOUND Server")
-app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=CORS_ORIGINS,
+    allow_methods=("GET", "POST"),
+    allow_headers=("content-type",),
+    max_age=86400,
+)
+
+
+@app.on_event("startup")
+async def warmup():
+    """Start loading the Ollama model for /api/chat (in the background)"""
+    if RAG_AVAILABLE:
+        warmup_intent_model()
 
 # ── HELPER: live RAG doc count ────────────────────────────────
 def get_rag_doc_count() -> int:
     try:
-        import chromadb
         client = chromadb.PersistentClient(path="./chroma_db")
         col = client.get_collection("orbital_dynamics")
         return col.count()
@@ -71,7 +129,7 @@ async def websocket_sim(websocket: WebSocket):
     steps_per_frame = 2
 
     async def send(obj):
-        await websocket.send_text(json.dumps(obj))
+        await websocket.send_text(dumps(obj))
 
     try:
         while True:
@@ -81,13 +139,13 @@ async def websocket_sim(websocket: WebSocket):
                     # Try to receive message without blocking
                     try:
                         raw = await asyncio.wait_for(websocket.receive_text(), timeout=0.001)
-                        msg = json.loads(raw)
+                        msg = loads(raw)
                     except asyncio.TimeoutError:
                         msg = None
                 else:
                     # Blocking receive when paused
                     raw = await websocket.receive_text()
-                    msg = json.loads(raw)
+                    msg = loads(raw)
             except WebSocketDisconnect:
                 break
 
@@ -128,12 +186,7 @@ async def websocket_sim(websocket: WebSocket):
                         result = {"ok": True, "scenario": scenario, "source": "editor"}
                     else:
                         # Generate scenario via AI
-                        try:
-                            from ai_scenario_generator import get_scenario
-                            result = get_scenario(prompt)
-                        except ImportError:
-                            from ai_scenario_generator import get_scenario
-                            result = get_scenario(prompt)
+                        result = await get_scenario(prompt)
 
                     if not result["ok"]:
                         await send({"type": "error", "message": result.get("error", "Failed to generate scenario")})
@@ -143,13 +196,9 @@ async def websocket_sim(websocket: WebSocket):
                     await send({"type": "status", "message": f"Loading simulation: {scenario.get('name', '?')}"})
 
                     # Initialize REBOUND engine
-                    try:
-                        import rebound
-                        from rebound_engine import ReboundEngine
-                    except ImportError:
-                        from rebound_engine import ReboundEngine
-
                     engine = ReboundEngine()
+                    # "columns" = parallel arrays per frame instead of per-body dicts
+                    engine.frame_format = msg.get("frame_format", "bodies")
 
                     # Handle Horizons-based scenarios
                     if "use_horizons" in scenario:
@@ -245,23 +294,12 @@ async def simulate_once(req: SimRequest):
     Non-streaming: generate scenario + compute N frames, return all at once.
     Useful for generating trajectory plots without WebSocket.
     """
-    try:
-        from ai_scenario_generator import get_scenario
-    except ImportError:
-        from ai_scenario_generator import get_scenario
-
-    result = get_scenario(req.prompt)
+    result = await get_scenario(req.prompt)
     if not result["ok"]:
         return JSONResponse({"error": result.get("error")}, status_code=400)
 
     scenario = result["scenario"]
 
-    try:
-        import rebound
-        from rebound_engine import ReboundEngine
-    except ImportError:
-        from rebound_engine import ReboundEngine
-
     engine = ReboundEngine()
 
     if "use_horizons" in scenario:
@@ -275,7 +313,9 @@ async def simulate_once(req: SimRequest):
     n_frames = req.frames_per_second * 5  # 5 seconds of simulation
     frames = []
     for _ in range(min(n_frames, 300)):  # cap at 300 frames
-        frames.append(engine.step(req.steps_per_frame))
+        frame = engine.step(req.steps_per_frame)
+        # Frame body dicts are reused by the engine — snapshot them
+        frames.append({**frame, "bodies": [dict(b) for b in frame["bodies"]]})
 
     return {
         "scenario": scenario,
@@ -289,10 +329,8 @@ async def simulate_once(req: SimRequest):
 async def chat(req: ChatRequest):
     """Existing chat endpoint — unchanged from your original api_server.py"""
     try:
-        from query_rag import query_rag_multi, is_orbital_query
-        from intent_parser import parse_intent, answer_with_rag
-        from physics_engine import compute_orbit, compute_hohmann, compute_multi_orbit, SOLAR_SYSTEM
-        from visualizer import plot_orbit, plot_hohmann, plot_multi_orbit
+        if not RAG_AVAILABLE:
+            raise ImportError("RAG/physics modules not available")
 
         msg = req.message.strip()
 
@@ -302,9 +340,10 @@ async def chat(req: ChatRequest):
                 "plot": None, "data": None, "intent": None, "sim_prompt": None
             }
 
-        intent     = parse_intent(msg)
-        rag_ctx    = query_rag_multi(msg)
-        text_ans   = answer_with_rag(msg, rag_ctx) if rag_ctx else "No relevant data found."
+        # Intent parse and retrieval only need the message — run them together
+        intent, rag_ctx = await asyncio.gather(parse_intent_async(msg),
+                                               query_rag_multi_async(msg))
+        text_ans   = await answer_with_rag_async(msg, rag_ctx) if rag_ctx else "No relevant data found."
 
         # Detect if user wants a simulation → return sim_prompt for frontend
         sim_keywords = ["simulate", "show", "animate", "visualize", "watch", "run", "model"]
@@ -316,15 +355,9 @@ async def chat(req: ChatRequest):
         body   = (intent.get("body") or "").lower()
         action = (intent.get("action") or "").lower()
 
-        if intent.get("intent") in ["simulate","plot"] and body in SOLAR_SYSTEM:
-            dur   = intent.get("duration_days") or 365
-            orbit = compute_orbit(body, duration_days=int(dur))
-            if orbit:
-                plot_b64 = plot_orbit(orbit, f"{body.title()} — {int(dur)}d Trajectory")
-                num_data = orbit["elements"]
-
-        elif "transfer" in action or "hohmann" in msg.lower():
-            bodies = [b for b in SOLAR_SYSTEM if b in msg.lower()]
+        # Transfers first: their intent also names the target body
+        if "transfer" in action or "hohmann" in msg.lower():
+            bodies = find_bodies(msg)
             b1 = bodies[0] if len(bodies) > 0 else "earth"
             b2 = bodies[1] if len(bodies) > 1 else "mars"
             tf = compute_hohmann(b1, b2)
@@ -333,6 +366,13 @@ async def chat(req: ChatRequest):
                 num_data = {"from":b1,"to":b2,"transfer_days":tf["transfer_days"],
                             "delta_v1":tf["delta_v1"],"delta_v2":tf["delta_v2"]}
 
+        elif intent.get("intent") in ["simulate","plot"] and body in SOLAR_SYSTEM:
+            dur   = intent.get("duration_days") or 365
+            orbit = compute_orbit(body, duration_days=int(dur))
+            if orbit:
+                plot_b64 = plot_orbit(orbit, f"{body.title()} — {int(dur)}d Trajectory")
+                num_data = orbit["elements"]
+
         elif "solar system" in msg.lower() or "all planets" in msg.lower():
             orbits = compute_multi_orbit(["mercury","venus","earth","mars","jupiter","saturn"],365)
             if orbits:
@@ -349,11 +389,7 @@ async def chat(req: ChatRequest):
 
 @app.get("/api/health")
 async def health():
-    try:
-        import rebound
-        rb_ver = rebound.__version__
-    except:
-        rb_ver = "not installed"
+    rb_ver = rebound.__version__
     return {
         "status": "online",
         "rebound": rb_ver,
@@ -381,7 +417,6 @@ async def horizons_scenario():
         "Neptune": {"color":"#3f54ba","radius":9, "type":"planet"},
     }
     try:
-        import rebound, math
         sim = rebound.Simulation()
         sim.units = ('AU','yr','Msun')
         for name in BODIES: